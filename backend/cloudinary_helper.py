@@ -1,3 +1,4 @@
+import asyncio
 import cloudinary
 import cloudinary.uploader
 from cloudinary.api import delete_resources_by_prefix
@@ -22,20 +23,33 @@ ALLOWED_IMAGE_TYPES = {"image/jpeg", "image/png", "image/webp", "image/jpg"}
 ALLOWED_VIDEO_TYPES = {"video/mp4", "video/quicktime", "video/mpeg"}
 MAX_IMAGE_SIZE = 10 * 1024 * 1024  # 10MB
 MAX_VIDEO_SIZE = 500 * 1024 * 1024  # 500MB
+# upload_large holds one chunk in memory at a time; Cloudinary's minimum chunk is 5MB
+UPLOAD_CHUNK_SIZE = 6 * 1024 * 1024
+
+
+async def _upload_large(file_path: str, filename: Optional[str], upload_params: dict) -> dict:
+    """Send a file from disk in UPLOAD_CHUNK_SIZE pieces, off the event loop."""
+    if filename:
+        upload_params["filename"] = filename
+    return await asyncio.to_thread(
+        cloudinary.uploader.upload_large, file_path, chunk_size=UPLOAD_CHUNK_SIZE, **upload_params
+    )
 
 
 async def upload_image(
-    file_content: bytes,
+    file_path: str,
     folder: str,
-    eager_transforms: Optional[List[dict]] = None
+    eager_transforms: Optional[List[dict]] = None,
+    filename: Optional[str] = None
 ) -> dict:
     """
     Upload an image to Cloudinary with automatic optimization.
     
     Args:
-        file_content: The file bytes to upload
+        file_path: Path of the spooled upload on local disk
         folder: Cloudinary folder path (e.g., "spencer-green/rooms")
         eager_transforms: List of eager transformations to apply
+        filename: Original file name, used for the public ID
     
     Returns:
         Dictionary containing upload response with public_id, secure_url, and metadata
@@ -59,7 +73,7 @@ async def upload_image(
                 {"width": 800, "height": 600, "crop": "fill", "gravity": "auto", "quality": "auto"}
             ]
         
-        result = cloudinary.uploader.upload(file_content, **upload_params)
+        result = await _upload_large(file_path, filename, upload_params)
         
         return {
             "public_id": result.get("public_id"),
@@ -78,15 +92,17 @@ async def upload_image(
 
 
 async def upload_video(
-    file_content: bytes,
-    folder: str
+    file_path: str,
+    folder: str,
+    filename: Optional[str] = None
 ) -> dict:
     """
     Upload a video to Cloudinary with automatic transcoding and thumbnail generation.
     
     Args:
-        file_content: The video file bytes to upload
+        file_path: Path of the spooled video on local disk
         folder: Cloudinary folder path
+        filename: Original file name, used for the public ID
     
     Returns:
         Dictionary containing upload response with public_id, secure_url, duration, and thumbnails
@@ -104,7 +120,7 @@ async def upload_video(
             "eager_async": True
         }
         
-        result = cloudinary.uploader.upload(file_content, **upload_params)
+        result = await _upload_large(file_path, filename, upload_params)
         
         # Generate thumbnail URL
         thumbnail_url = cloudinary.CloudinaryImage(result.get("public_id")).build_url(
@@ -18,6 +18,11 @@ JWT_EXPIRATION_HOURS = 24
 RESEND_API_KEY = os.environ.get('RESEND_API_KEY', '')
 SENDER_EMAIL = os.environ.get('SENDER_EMAIL', 'onboarding@resend.dev')
 
+# Email outbox transport: "resend" or "smtp" (e.g. a local SMTP catcher in development)
+EMAIL_TRANSPORT = os.environ.get('EMAIL_TRANSPORT', 'resend')
+SMTP_HOST = os.environ.get('SMTP_HOST', 'localhost')
+SMTP_PORT = int(os.environ.get('SMTP_PORT', '1025'))
+
 # Cloudinary
 CLOUDINARY_CLOUD_NAME = os.environ.get('CLOUDINARY_CLOUD_NAME')
 CLOUDINARY_API_KEY = os.environ.get('CLOUDINARY_API_KEY')
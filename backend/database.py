@@ -1,8 +1,111 @@
+import logging
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
 from config import MONGO_URL, DB_NAME
 
+logger = logging.getLogger(__name__)
+
 client = AsyncIOMotorClient(MONGO_URL)
 db = client[DB_NAME]
 
+# Every index the routes rely on, applied idempotently at startup.
+# Unique indexes back the lookups the code already treats as unique.
+INDEXES = {
+    "room_types": [
+        IndexModel([("room_type_id", ASCENDING)], name="room_type_id_unique", unique=True),
+        IndexModel([("is_active", ASCENDING)], name="is_active"),
+    ],
+    "room_inventory": [
+        IndexModel([("room_type_id", ASCENDING), ("date", ASCENDING)], name="room_type_date_unique", unique=True),
+        IndexModel([("date", ASCENDING)], name="date"),
+    ],
+    "reservations": [
+        IndexModel([("reservation_id", ASCENDING)], name="reservation_id_unique", unique=True),
+        IndexModel([("booking_code", ASCENDING)], name="booking_code_unique", unique=True),
+        IndexModel([("guest_email", ASCENDING)], name="guest_email"),
+        IndexModel([("created_at", DESCENDING), ("reservation_id", DESCENDING)], name="created_at_reservation_id"),
+        IndexModel([("check_in", ASCENDING), ("check_out", ASCENDING)], name="stay_dates"),
+        # Equality filter + the admin list's (created_at, reservation_id) keyset order
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING), ("reservation_id", DESCENDING)], name="status_created_at"),
+        IndexModel([("room_type_id", ASCENDING), ("created_at", DESCENDING), ("reservation_id", DESCENDING)], name="room_type_created_at"),
+        IndexModel([("promo_code", ASCENDING), ("created_at", DESCENDING), ("reservation_id", DESCENDING)], name="promo_code_created_at"),
+    ],
+    "promo_codes": [
+        IndexModel([("code", ASCENDING)], name="code_unique", unique=True),
+        IndexModel([("promo_id", ASCENDING)], name="promo_id_unique", unique=True),
+        IndexModel([("batch_id", ASCENDING), ("code", ASCENDING)], name="batch_code", sparse=True),
+    ],
+    "site_content": [
+        IndexModel([("page", ASCENDING), ("section", ASCENDING)], name="page_section_unique", unique=True),
+        IndexModel([("content_id", ASCENDING)], name="content_id_unique", unique=True),
+    ],
+    "reviews": [
+        IndexModel([("review_id", ASCENDING)], name="review_id_unique", unique=True),
+        IndexModel([("is_visible", ASCENDING), ("created_at", DESCENDING), ("review_id", DESCENDING)], name="visible_created_at_review_id"),
+        IndexModel([("created_at", DESCENDING), ("review_id", DESCENDING)], name="created_at_review_id"),
+    ],
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "review_stats": [
+        IndexModel([("scope", ASCENDING)], name="scope_unique", unique=True),
+    ],
+    "daily_stats": [
+        IndexModel([("date", ASCENDING), ("room_type_id", ASCENDING)], name="date_room_type_unique", unique=True),
+    ],
+    "idempotency_keys": [
+        IndexModel([("scope", ASCENDING), ("key", ASCENDING)], name="scope_key_unique", unique=True),
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "email_outbox": [
+        IndexModel([("message_id", ASCENDING)], name="message_id_unique", unique=True),
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_next_attempt_at"),
+        IndexModel([("claim", ASCENDING)], name="claim", sparse=True),
+        # Delivered mail is kept for a month for troubleshooting
+        IndexModel([("sent_at", ASCENDING)], name="sent_at_ttl", expireAfterSeconds=30 * 24 * 3600),
+    ],
+    "password_resets": [
+        IndexModel([("token", ASCENDING)], name="token_unique", unique=True),
+    ],
+    "rebuild_locks": [
+        IndexModel([("name", ASCENDING)], name="name_unique", unique=True),
+        # A lock left by a crashed rebuild frees itself
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+}
+
+async def ensure_indexes():
+    """Create any missing manifest index. Failures are logged, never fatal."""
+    for collection, indexes in INDEXES.items():
+        for index in indexes:
+            try:
+                await db[collection].create_indexes([index])
+            except OperationFailure as e:
+                # Typically duplicate data under a unique index or a clashing legacy index
+                logger.error(f"Could not create index {collection}.{index.document['name']}: {e}")
+
+async def index_report() -> list:
+    """Compare the manifest against the live indexes and their usage counters."""
+    report = []
+    for collection, indexes in INDEXES.items():
+        existing = await db[collection].index_information()
+        try:
+            stats = await db[collection].aggregate([{"$indexStats": {}}]).to_list(None)
+            usage = {s["name"]: s["accesses"]["ops"] for s in stats}
+        except OperationFailure:
+            usage = {}
+
+        expected = {index.document["name"] for index in indexes}
+        report.append({
+            "collection": collection,
+            "missing": sorted(expected - set(existing)),
+            "unused": sorted(name for name, ops in usage.items() if ops == 0 and name != "_id_"),
+            "unmanaged": sorted(name for name in existing if name not in expected and name != "_id_"),
+            "usage": usage
+        })
+    return report
+
 async def close_db():
     client.close()
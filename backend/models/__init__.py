@@ -1,15 +1,15 @@
 from models.user import UserCreate, UserLogin, UserResponse
 from models.room import RoomType, RoomInventory, BulkUpdateRequest
 from models.reservation import ReservationCreate, Reservation
-from models.review import ReviewCreate, Review
-from models.promo import PromoCode
+from models.review import ReviewCreate, Review, ReviewBulkVisibility
+from models.promo import PromoCode, PromoRule, PromoValidateRequest, PromoBulkCreate
 from models.content import SiteContent
 
 __all__ = [
     "UserCreate", "UserLogin", "UserResponse",
     "RoomType", "RoomInventory", "BulkUpdateRequest",
     "ReservationCreate", "Reservation",
-    "ReviewCreate", "Review",
-    "PromoCode",
+    "ReviewCreate", "Review", "ReviewBulkVisibility",
+    "PromoCode", "PromoRule", "PromoValidateRequest", "PromoBulkCreate",
     "SiteContent"
 ]
@@ -1,8 +1,26 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
 from datetime import datetime, timezone
 import uuid
 
+class PromoRule(BaseModel):
+    """One discount tier of a promo; every condition left as None matches any stay."""
+    discount_type: str
+    discount_value: float
+    min_nights: Optional[int] = None
+    max_nights: Optional[int] = None
+    stay_from: Optional[str] = None
+    stay_until: Optional[str] = None
+    # Allowed check-in..check-out nights, 0 = Monday
+    weekdays: Optional[List[int]] = None
+    # Booked at least this many days before check-in
+    early_bird_days: Optional[int] = None
+    # Booked at most this many days before check-in
+    last_minute_days: Optional[int] = None
+    # Higher priority is tried first; stackable tiers add to the one above
+    priority: int = 0
+    stackable: bool = False
+
 class PromoCode(BaseModel):
     promo_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     code: str
@@ -13,5 +31,39 @@ class PromoCode(BaseModel):
     room_type_ids: List[str] = []
     valid_from: str
     valid_until: str
+    min_nights: Optional[int] = None
+    max_nights: Optional[int] = None
+    stay_from: Optional[str] = None
+    stay_until: Optional[str] = None
+    weekdays: Optional[List[int]] = None
+    early_bird_days: Optional[int] = None
+    last_minute_days: Optional[int] = None
+    # Optional tiers replacing discount_type/discount_value when present
+    rules: List[PromoRule] = []
     is_active: bool = True
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+
+class PromoValidateRequest(BaseModel):
+    code: str
+    room_type_id: str
+    check_in: str
+    check_out: str
+
+class PromoBulkCreate(BaseModel):
+    # "#" is a digit, "?" a letter, "*" a letter or digit; anything else is copied as is
+    pattern: str
+    count: int
+    discount_type: str
+    discount_value: float
+    max_usage: int = 1
+    room_type_ids: List[str] = []
+    valid_from: str
+    valid_until: str
+    min_nights: Optional[int] = None
+    max_nights: Optional[int] = None
+    stay_from: Optional[str] = None
+    stay_until: Optional[str] = None
+    weekdays: Optional[List[int]] = None
+    early_bird_days: Optional[int] = None
+    last_minute_days: Optional[int] = None
+    rules: List[PromoRule] = []
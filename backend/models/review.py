@@ -1,4 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr
+from typing import List
 from datetime import datetime, timezone
 import uuid
 
@@ -16,5 +17,10 @@ class Review(BaseModel):
     rating: int
     comment: str
     reservation_id: str = ""
+    room_type_id: str = ""
     is_visible: bool = False
     created_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+
+class ReviewBulkVisibility(BaseModel):
+    review_ids: List[str]
+    is_visible: bool
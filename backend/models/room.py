@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime, timezone
 import uuid
 
@@ -24,9 +24,13 @@ class RoomInventory(BaseModel):
     is_closed: bool = False
 
 class BulkUpdateRequest(BaseModel):
-    room_type_id: str
+    room_type_id: Optional[str] = None
+    room_type_ids: List[str] = []
     start_date: str
     end_date: str
     allotment: Optional[int] = None
     rate: Optional[float] = None
     is_closed: Optional[bool] = None
+    # Weekdays use Python numbering: 0 = Monday ... 6 = Sunday. None applies to every day.
+    weekdays: Optional[List[int]] = None
+    weekday_rates: Dict[int, float] = {}
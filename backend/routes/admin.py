@@ -1,46 +1,85 @@
 from fastapi import APIRouter, HTTPException, Depends
 from datetime import datetime, timezone
+import asyncio
+from cachetools import TTLCache
 
-from database import db
+from database import db, index_report
 from services.auth import hash_password, require_admin
+from services.reports import performance_report, clear_report_cache
+from services.stats import rebuild_daily_stats
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
 # Dashboard
+DASHBOARD_CACHE_SECONDS = 30
+_dashboard_cache = TTLCache(maxsize=1, ttl=DASHBOARD_CACHE_SECONDS)
+
+async def _sum_field(collection, match: dict, field: str):
+    result = await collection.aggregate([
+        {"$match": match},
+        {"$group": {"_id": None, "total": {"$sum": f"${field}"}}}
+    ]).to_list(1)
+    return result[0]["total"] if result else 0
+
 @router.get("/dashboard")
 async def get_dashboard_stats(user: dict = Depends(require_admin)):
+    stats = _dashboard_cache.get("stats")
+    if stats is not None:
+        return stats
+    
     today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
     month_start = datetime.now(timezone.utc).replace(day=1).strftime("%Y-%m-%d")
     
-    rooms = await db.room_types.find({"is_active": True}, {"_id": 0}).to_list(100)
-    
-    today_occupied = await db.reservations.count_documents({
-        "check_in": {"$lte": today},
-        "check_out": {"$gt": today},
-        "status": {"$in": ["confirmed", "checked_in"]}
-    })
-    
-    today_inventory = await db.room_inventory.find({"date": today}, {"_id": 0}).to_list(100)
-    available_today = sum(inv.get("allotment", 0) for inv in today_inventory)
-    
-    month_reservations = await db.reservations.find({
-        "created_at": {"$gte": month_start},
-        "status": {"$nin": ["cancelled"]}
-    }, {"_id": 0}).to_list(1000)
-    month_revenue = sum(r.get("total_amount", 0) for r in month_reservations)
+    # Independent queries run concurrently, so the dashboard costs one round-trip time
+    total_room_types, today_occupied, available_today, month_revenue, pending_reviews, recent_reservations = await asyncio.gather(
+        db.room_types.count_documents({"is_active": True}),
+        db.reservations.count_documents({
+            "check_in": {"$lte": today},
+            "check_out": {"$gt": today},
+            "status": {"$in": ["confirmed", "checked_in"]}
+        }),
+        _sum_field(db.room_inventory, {"date": today}, "allotment"),
+        # Pre-aggregated bookings made this month, net of cancellations
+        _sum_field(db.daily_stats, {"date": {"$gte": month_start}}, "pickup_revenue"),
+        db.reviews.count_documents({"is_visible": False}),
+        db.reservations.find({}, {"_id": 0}).sort("created_at", -1).to_list(5)
+    )
     
-    pending_reviews = await db.reviews.count_documents({"is_visible": False})
-    
-    recent_reservations = await db.reservations.find({}, {"_id": 0}).sort("created_at", -1).to_list(5)
-    
-    return {
+    stats = {
         "occupied_rooms": today_occupied,
         "available_rooms": available_today,
         "monthly_revenue": month_revenue,
-        "total_room_types": len(rooms),
+        "total_room_types": total_room_types,
         "pending_reviews": pending_reviews,
         "recent_reservations": recent_reservations
     }
+    _dashboard_cache["stats"] = stats
+    return stats
+
+@router.post("/stats/rebuild")
+async def rebuild_stats(user: dict = Depends(require_admin)):
+    rows = await rebuild_daily_stats()
+    if rows is None:
+        raise HTTPException(status_code=409, detail="Daily stats are already being rebuilt")
+    _dashboard_cache.clear()
+    clear_report_cache()
+    return {"message": f"Rebuilt {rows} daily stats rows"}
+
+# Reports
+@router.get("/reports/performance")
+async def get_performance_report(
+    start_date: str,
+    end_date: str,
+    granularity: str = "day",
+    room_type_id: str = None,
+    user: dict = Depends(require_admin)
+):
+    return await performance_report(start_date, end_date, granularity, room_type_id)
+
+# Index health
+@router.get("/indexes")
+async def get_index_report(user: dict = Depends(require_admin)):
+    return await index_report()
 
 # User Management
 @router.get("/users")
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends
 from pydantic import EmailStr
 from datetime import datetime, timezone, timedelta
 import uuid
@@ -46,7 +46,7 @@ async def login(credentials: UserLogin):
     }
 
 @router.post("/forgot-password")
-async def forgot_password(email: EmailStr, background_tasks: BackgroundTasks):
+async def forgot_password(email: EmailStr):
     user = await db.users.find_one({"email": email}, {"_id": 0})
     if not user:
         return {"message": "If email exists, reset link will be sent"}
@@ -58,7 +58,7 @@ async def forgot_password(email: EmailStr, background_tasks: BackgroundTasks):
         "expires_at": (datetime.now(timezone.utc) + timedelta(hours=1)).isoformat()
     })
     
-    background_tasks.add_task(send_password_reset_email, email, reset_token)
+    await send_password_reset_email(email, reset_token)
     return {"message": "If email exists, reset link will be sent"}
 
 @router.post("/reset-password")
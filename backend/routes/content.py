@@ -1,43 +1,49 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header
 from datetime import datetime, timezone
+from pymongo import ReturnDocument
 
 from database import db
 from models.content import SiteContent
 from services.auth import require_admin
+from services.bootstrap import get_bootstrap_payload, invalidate_bootstrap
+from services.content_cache import get_content_payload, payload_response, invalidate_content
+from services.settings import invalidate_hotel_settings
 
 router = APIRouter(tags=["content"])
 
 @router.get("/content")
-async def get_all_content():
-    content = await db.site_content.find({}, {"_id": 0}).to_list(500)
-    return content
+async def get_all_content(if_none_match: str = Header(None), accept_encoding: str = Header("")):
+    return payload_response(await get_content_payload(), if_none_match, accept_encoding)
 
 @router.get("/content/{page}")
-async def get_page_content(page: str):
-    content = await db.site_content.find({"page": page}, {"_id": 0}).to_list(100)
-    return content
+async def get_page_content(page: str, if_none_match: str = Header(None), accept_encoding: str = Header("")):
+    return payload_response(await get_content_payload(page), if_none_match, accept_encoding)
+
+@router.get("/bootstrap/{page}")
+async def get_page_bootstrap(page: str, if_none_match: str = Header(None), accept_encoding: str = Header("")):
+    """Content, rooms, reviews and settings for a public page in one round trip."""
+    return payload_response(await get_bootstrap_payload(page), if_none_match, accept_encoding)
 
 @router.post("/admin/content")
 async def create_content(content: SiteContent, user: dict = Depends(require_admin)):
     content_doc = content.model_dump()
     
-    existing = await db.site_content.find_one({
-        "section": content_doc["section"],
-        "page": content_doc["page"]
-    }, {"_id": 0})
-    
-    if existing:
-        await db.site_content.update_one(
-            {"content_id": existing["content_id"]},
-            {"$set": {"content": content_doc["content"], "updated_at": datetime.now(timezone.utc).isoformat()}}
-        )
-        content_doc["content_id"] = existing["content_id"]
-    else:
-        await db.site_content.insert_one(content_doc)
+    # One upsert on the unique (page, section) key, so concurrent creates can't collide
+    stored = await db.site_content.find_one_and_update(
+        {"page": content_doc["page"], "section": content_doc["section"]},
+        {
+            "$set": {"content": content_doc["content"], "updated_at": datetime.now(timezone.utc).isoformat()},
+            "$setOnInsert": {"content_id": content_doc["content_id"], "content_type": content_doc["content_type"]}
+        },
+        projection={"_id": 0},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
     
-    # Exclude _id from response (MongoDB adds it during insert)
-    content_doc.pop("_id", None)
-    return content_doc
+    invalidate_content()
+    invalidate_hotel_settings()
+    invalidate_bootstrap()
+    return stored
 
 @router.put("/admin/content/{content_id}")
 async def update_content(content_id: str, content: dict, user: dict = Depends(require_admin)):
@@ -45,4 +51,7 @@ async def update_content(content_id: str, content: dict, user: dict = Depends(re
     result = await db.site_content.update_one({"content_id": content_id}, {"$set": content})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Content not found")
+    invalidate_content()
+    invalidate_hotel_settings()
+    invalidate_bootstrap()
     return {"message": "Content updated"}
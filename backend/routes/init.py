@@ -4,6 +4,9 @@ import uuid
 
 from database import db
 from services.auth import hash_password
+from services.bootstrap import invalidate_bootstrap
+from services.content_cache import invalidate_content
+from services.settings import invalidate_hotel_settings
 
 router = APIRouter(tags=["init"])
 
@@ -157,5 +160,8 @@ async def init_default_data():
             "updated_at": datetime.now(timezone.utc).isoformat()
         })
     await db.site_content.insert_many(gallery_docs)
+    invalidate_content()
+    invalidate_hotel_settings()
+    invalidate_bootstrap()
     
     return {"message": "Default data initialized", "admin_email": "admin@spencergreenhotel.com", "admin_password": "admin123"}
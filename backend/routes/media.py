@@ -1,12 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends, File, UploadFile
+from fastapi import APIRouter, HTTPException, Depends, Request
 from typing import Optional
 from datetime import datetime, timezone
 
 from database import db
 from services.auth import require_admin
+from services.bootstrap import invalidate_bootstrap
+from services.uploads import receive_upload
 from cloudinary_helper import (
     upload_image, upload_video, delete_media, delete_folder,
-    validate_image_file, validate_video_file
+    validate_image_file, validate_video_file, MAX_IMAGE_SIZE, MAX_VIDEO_SIZE
 )
 
 router = APIRouter(prefix="/media", tags=["media"])
@@ -14,7 +16,7 @@ router = APIRouter(prefix="/media", tags=["media"])
 
 @router.post("/upload/gallery")
 async def upload_gallery_image(
-    file: UploadFile = File(...),
+    request: Request,
     category: str = "general",
     user: dict = Depends(require_admin)
 ):
@@ -22,17 +24,16 @@ async def upload_gallery_image(
     Upload gallery image for the hotel.
     Categories: general, rooms, facilities, restaurant, pool, spa, lobby
     """
-    file_content = await file.read()
-    file_size = len(file_content)
-    
-    is_valid, error = validate_image_file(file.content_type, file_size)
-    if not is_valid:
-        raise HTTPException(status_code=400, detail=error)
-    
-    result = await upload_image(
-        file_content=file_content,
-        folder=f"gallery/{category}"
-    )
+    # Spooled to disk as it arrives; type and size are checked while streaming
+    upload = await receive_upload(request, validate_image_file, MAX_IMAGE_SIZE)
+    try:
+        result = await upload_image(
+            file_path=upload.path,
+            folder=f"gallery/{category}",
+            filename=upload.filename
+        )
+    finally:
+        upload.remove()
     
     return {
         "success": True,
@@ -42,7 +43,7 @@ async def upload_gallery_image(
 
 @router.post("/upload/room-image")
 async def upload_room_image(
-    file: UploadFile = File(...),
+    request: Request,
     room_type_id: str = None,
     user: dict = Depends(require_admin)
 ):
@@ -56,17 +57,15 @@ async def upload_room_image(
     if not room:
         raise HTTPException(status_code=404, detail="Room type not found")
     
-    file_content = await file.read()
-    file_size = len(file_content)
-    
-    is_valid, error = validate_image_file(file.content_type, file_size)
-    if not is_valid:
-        raise HTTPException(status_code=400, detail=error)
-    
-    result = await upload_image(
-        file_content=file_content,
-        folder=f"rooms/{room_type_id}"
-    )
+    upload = await receive_upload(request, validate_image_file, MAX_IMAGE_SIZE)
+    try:
+        result = await upload_image(
+            file_path=upload.path,
+            folder=f"rooms/{room_type_id}",
+            filename=upload.filename
+        )
+    finally:
+        upload.remove()
     
     # Update room with new image
     current_images = room.get("images", [])
@@ -76,6 +75,7 @@ async def upload_room_image(
         {"room_type_id": room_type_id},
         {"$set": {"images": current_images, "updated_at": datetime.now(timezone.utc).isoformat()}}
     )
+    invalidate_bootstrap()
     
     return {
         "success": True,
@@ -85,7 +85,7 @@ async def upload_room_image(
 
 @router.post("/upload/room-video")
 async def upload_room_video(
-    file: UploadFile = File(...),
+    request: Request,
     room_type_id: str = None,
     user: dict = Depends(require_admin)
 ):
@@ -99,17 +99,15 @@ async def upload_room_video(
     if not room:
         raise HTTPException(status_code=404, detail="Room type not found")
     
-    file_content = await file.read()
-    file_size = len(file_content)
-    
-    is_valid, error = validate_video_file(file.content_type, file_size)
-    if not is_valid:
-        raise HTTPException(status_code=400, detail=error)
-    
-    result = await upload_video(
-        file_content=file_content,
-        folder=f"rooms/{room_type_id}/videos"
-    )
+    upload = await receive_upload(request, validate_video_file, MAX_VIDEO_SIZE)
+    try:
+        result = await upload_video(
+            file_path=upload.path,
+            folder=f"rooms/{room_type_id}/videos",
+            filename=upload.filename
+        )
+    finally:
+        upload.remove()
     
     # Update room with video URL
     await db.room_types.update_one(
@@ -121,6 +119,7 @@ async def upload_room_video(
             "updated_at": datetime.now(timezone.utc).isoformat()
         }}
     )
+    invalidate_bootstrap()
     
     return {
         "success": True,
@@ -130,7 +129,7 @@ async def upload_room_video(
 
 @router.post("/upload/content-image")
 async def upload_content_image(
-    file: UploadFile = File(...),
+    request: Request,
     section: str = "general",
     user: dict = Depends(require_admin)
 ):
@@ -138,17 +137,15 @@ async def upload_content_image(
     Upload image for CMS content sections.
     Sections: hero, about, facilities, promo, banner
     """
-    file_content = await file.read()
-    file_size = len(file_content)
-    
-    is_valid, error = validate_image_file(file.content_type, file_size)
-    if not is_valid:
-        raise HTTPException(status_code=400, detail=error)
-    
-    result = await upload_image(
-        file_content=file_content,
-        folder=f"content/{section}"
-    )
+    upload = await receive_upload(request, validate_image_file, MAX_IMAGE_SIZE)
+    try:
+        result = await upload_image(
+            file_path=upload.path,
+            folder=f"content/{section}",
+            filename=upload.filename
+        )
+    finally:
+        upload.remove()
     
     return {
         "success": True,
@@ -213,6 +210,7 @@ async def delete_room_image(
         {"room_type_id": room_type_id},
         {"$set": {"images": current_images, "updated_at": datetime.now(timezone.utc).isoformat()}}
     )
+    invalidate_bootstrap()
     
     return {"success": True, "message": "Image deleted"}
 
@@ -246,5 +244,6 @@ async def delete_room_video(
             "updated_at": datetime.now(timezone.utc).isoformat()
         }}
     )
+    invalidate_bootstrap()
     
     return {"success": True, "message": "Video deleted"}
@@ -1,43 +1,104 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from datetime import datetime, timezone
+from pymongo.errors import DuplicateKeyError
 
 from database import db
-from models.promo import PromoCode
+from models.promo import PromoCode, PromoValidateRequest, PromoBulkCreate
 from services.auth import require_admin
+from services.exports import export_documents
+from services.pricing import quote_stay
+from services.promo import invalidate_promos, create_codes_in_bulk
+from services.promo_rules import CONDITION_FIELDS, check_promo_rules
+from services.rate_limit import RateLimiter
 
-router = APIRouter(prefix="/admin/promo-codes", tags=["promo"])
+BULK_CODE_COLUMNS = ["code", "discount_type", "discount_value", "max_usage", "valid_from", "valid_until", "batch_id"]
 
-@router.get("")
+# Slows down guessing codes through the public preview
+VALIDATE_LIMIT_PER_MINUTE = 20
+_validate_limiter = RateLimiter(VALIDATE_LIMIT_PER_MINUTE, 60)
+
+router = APIRouter(tags=["promo"])
+
+# Public routes
+@router.post("/promo/validate")
+async def validate_promo_code(request: PromoValidateRequest, http_request: Request):
+    """Preview a promo's discount for a stay without consuming a use."""
+    _validate_limiter.check(http_request)
+    
+    room = await db.room_types.find_one({"room_type_id": request.room_type_id, "is_active": True}, {"_id": 0})
+    if not room:
+        raise HTTPException(status_code=404, detail="Room not found")
+    
+    quote = await quote_stay(room, request.check_in, request.check_out, request.code)
+    valid = quote["promo_id"] is not None
+    # Unknown and inapplicable codes get the same answer, so the preview can't be used to find real codes
+    message = "Promo code applied" if valid else "Promo code is not valid for this stay"
+    
+    return {
+        "valid": valid,
+        "code": request.code.upper(),
+        "message": message,
+        "subtotal": quote["subtotal"],
+        "discount_amount": quote["discount_amount"],
+        "total_amount": quote["total_amount"]
+    }
+
+# Admin routes
+@router.get("/admin/promo-codes")
 async def get_promo_codes(user: dict = Depends(require_admin)):
     promos = await db.promo_codes.find({}, {"_id": 0}).sort("created_at", -1).to_list(100)
     return promos
 
-@router.post("")
+@router.post("/admin/promo-codes")
 async def create_promo_code(promo: PromoCode, user: dict = Depends(require_admin)):
     promo_doc = promo.model_dump()
     promo_doc["code"] = promo_doc["code"].upper()
+    check_promo_rules(promo_doc)
     
-    existing = await db.promo_codes.find_one({"code": promo_doc["code"]}, {"_id": 0})
-    if existing:
+    # The unique index on code rejects duplicates without a lookup first
+    try:
+        await db.promo_codes.insert_one(promo_doc)
+    except DuplicateKeyError:
         raise HTTPException(status_code=400, detail="Promo code already exists")
-    
-    await db.promo_codes.insert_one(promo_doc)
+    invalidate_promos(promo_doc["code"])
+    # Exclude _id from response (MongoDB adds it during insert)
+    promo_doc.pop("_id", None)
     return promo_doc
 
-@router.put("/{promo_id}")
+@router.post("/admin/promo-codes/bulk")
+async def create_promo_codes_bulk(request: PromoBulkCreate, user: dict = Depends(require_admin)):
+    template = PromoCode(code=request.pattern, **request.model_dump(exclude={"pattern", "count"})).model_dump(
+        exclude={"promo_id", "code", "created_at"}
+    )
+    check_promo_rules(template)
+    batch_id = await create_codes_in_bulk(template, request.pattern, request.count)
+    invalidate_promos()
+    
+    cursor = db.promo_codes.find({"batch_id": batch_id}, {"_id": 0}).sort("code", 1)
+    return await export_documents(cursor, BULK_CODE_COLUMNS, "promo-codes")
+
+@router.put("/admin/promo-codes/{promo_id}")
 async def update_promo_code(promo_id: str, promo: dict, user: dict = Depends(require_admin)):
     if "code" in promo:
         promo["code"] = promo["code"].upper()
+    if any(field in promo for field in (*CONDITION_FIELDS, "rules", "valid_from", "valid_until")):
+        current = await db.promo_codes.find_one({"promo_id": promo_id}, {"_id": 0})
+        if current is None:
+            raise HTTPException(status_code=404, detail="Promo code not found")
+        check_promo_rules({**current, **promo})
+    # updated_at also keys the compiled rule cache
     promo["updated_at"] = datetime.now(timezone.utc).isoformat()
     
     result = await db.promo_codes.update_one({"promo_id": promo_id}, {"$set": promo})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Promo code not found")
+    invalidate_promos()
     return {"message": "Promo code updated"}
 
-@router.delete("/{promo_id}")
+@router.delete("/admin/promo-codes/{promo_id}")
 async def delete_promo_code(promo_id: str, user: dict = Depends(require_admin)):
     result = await db.promo_codes.delete_one({"promo_id": promo_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Promo code not found")
+    invalidate_promos()
     return {"message": "Promo code deleted"}
@@ -1,66 +1,72 @@
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
-from datetime import datetime, timezone, timedelta
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Header
+from datetime import datetime, timezone
+from pymongo import ReturnDocument
+import asyncio
+import logging
+import uuid
 
 from database import db
 from models.reservation import ReservationCreate, Reservation
 from services.auth import require_admin
 from services.email import send_reservation_email
+from services.exports import export_documents, RESERVATION_COLUMNS
+from services.idempotency import begin_request, complete_request, abandon_request
+from services.inventory_calendar import inventory_calendar, parse_date
+from services.pricing import quote_stay
+from services.promo import redeem_promo, release_promo
+from services.stats import record_reservation_created, record_status_change, STATS_PROJECTION
+from services.streaming import fetch_page, stream_documents, wants_ndjson, MAX_PAGE_SIZE
 
 router = APIRouter(tags=["reservations"])
+logger = logging.getLogger(__name__)
+
+# Filtered totals stop counting here so the X-Total-Count header stays cheap;
+# a capped total is flagged with X-Total-Count-Capped: true
+COUNT_LIMIT = 10000
 
 @router.post("/reservations")
-async def create_reservation(reservation: ReservationCreate, background_tasks: BackgroundTasks):
+async def create_reservation(
+    reservation: ReservationCreate,
+    idempotency_key: str = Header(None, alias="Idempotency-Key")
+):
+    if idempotency_key is None:
+        return await book_reservation(reservation)
+    
+    # A retried key replays the stored response without touching inventory, promos or email
+    replay = await begin_request("reservations", idempotency_key, reservation.model_dump())
+    if replay is not None:
+        return replay
+    try:
+        response = await book_reservation(reservation)
+    except Exception:
+        await abandon_request("reservations", idempotency_key)
+        raise
+    await complete_request("reservations", idempotency_key, response)
+    return response
+
+async def book_reservation(reservation: ReservationCreate) -> dict:
     room = await db.room_types.find_one({"room_type_id": reservation.room_type_id}, {"_id": 0})
     if not room:
         raise HTTPException(status_code=404, detail="Room type not found")
     
-    check_in = datetime.strptime(reservation.check_in, "%Y-%m-%d")
-    check_out = datetime.strptime(reservation.check_out, "%Y-%m-%d")
-    nights = (check_out - check_in).days
+    quote = await quote_stay(room, reservation.check_in, reservation.check_out, reservation.promo_code)
+    if quote["unavailable_dates"]:
+        raise HTTPException(status_code=400, detail=f"Room not available on {quote['unavailable_dates'][0]}")
     
-    if nights <= 0:
-        raise HTTPException(status_code=400, detail="Invalid dates")
+    # Hold the inventory first so a sold-out race never consumes a promo or stores a booking
+    start, end = parse_date(reservation.check_in), parse_date(reservation.check_out)
+    reservation_id = str(uuid.uuid4())
+    await inventory_calendar.claim_nights(reservation.room_type_id, start, end, reservation_id)
     
-    inventory = await db.room_inventory.find({
-        "room_type_id": reservation.room_type_id,
-        "date": {"$gte": reservation.check_in, "$lt": reservation.check_out}
-    }, {"_id": 0}).to_list(nights)
-    
-    total_rate = 0
-    for i in range(nights):
-        date_str = (check_in + timedelta(days=i)).strftime("%Y-%m-%d")
-        inv = next((x for x in inventory if x["date"] == date_str), None)
-        
-        if inv:
-            if inv.get("is_closed", False) or inv.get("allotment", 0) <= 0:
-                raise HTTPException(status_code=400, detail=f"Room not available on {date_str}")
-            total_rate += inv.get("rate", room.get("base_price", 500000))
-        else:
-            total_rate += room.get("base_price", 500000)
-    
-    discount = 0
-    if reservation.promo_code:
-        promo = await db.promo_codes.find_one({
-            "code": reservation.promo_code.upper(),
-            "is_active": True
-        }, {"_id": 0})
-        
-        if promo:
-            now = datetime.now(timezone.utc).isoformat()
-            if promo["valid_from"] <= now <= promo["valid_until"]:
-                if promo["current_usage"] < promo["max_usage"]:
-                    if not promo["room_type_ids"] or reservation.room_type_id in promo["room_type_ids"]:
-                        if promo["discount_type"] == "percent":
-                            discount = total_rate * (promo["discount_value"] / 100)
-                        else:
-                            discount = promo["discount_value"]
-                        
-                        await db.promo_codes.update_one(
-                            {"promo_id": promo["promo_id"]},
-                            {"$inc": {"current_usage": 1}}
-                        )
+    if quote["promo_id"]:
+        try:
+            await redeem_promo(quote["promo_id"], quote["promo_code"])
+        except Exception:
+            await inventory_calendar.release_nights(reservation.room_type_id, start, end, reservation_id)
+            raise
     
     res_doc = Reservation(
+        reservation_id=reservation_id,
         guest_name=reservation.guest_name,
         guest_email=reservation.guest_email,
         guest_phone=reservation.guest_phone,
@@ -69,27 +75,36 @@ async def create_reservation(reservation: ReservationCreate, background_tasks: B
         check_in=reservation.check_in,
         check_out=reservation.check_out,
         guests=reservation.guests,
-        nights=nights,
-        rate_per_night=total_rate / nights,
-        total_amount=total_rate - discount,
-        discount_amount=discount,
-        promo_code=reservation.promo_code,
+        nights=quote["nights"],
+        rate_per_night=quote["rate_per_night"],
+        total_amount=quote["total_amount"],
+        discount_amount=quote["discount_amount"],
+        promo_code=quote["promo_code"],
         special_requests=reservation.special_requests,
         status="pending"
     ).model_dump()
     
-    await db.reservations.insert_one(res_doc)
-    
-    # Update inventory
-    for i in range(nights):
-        date_str = (check_in + timedelta(days=i)).strftime("%Y-%m-%d")
-        await db.room_inventory.update_one(
-            {"room_type_id": reservation.room_type_id, "date": date_str},
-            {"$inc": {"allotment": -1}}
-        )
+    try:
+        await db.reservations.insert_one(res_doc)
+    except Exception:
+        await inventory_calendar.release_nights(reservation.room_type_id, start, end, reservation_id)
+        if quote["promo_id"]:
+            await release_promo(quote["promo_id"], quote["promo_code"])
+        raise
     
-    # Send email in background
-    background_tasks.add_task(send_reservation_email, res_doc, room)
+    # The booking is stored from here on, so follow-up failures are logged rather than
+    # raised; raising would abandon the idempotency key and let a retry book twice
+    follow_ups = (
+        ("settle inventory holds", inventory_calendar.settle_nights(reservation.room_type_id, start, end, reservation_id)),
+        ("record booking stats", record_reservation_created(res_doc)),
+        # Queued in the outbox; the sender worker delivers it outside the request
+        ("queue confirmation email", send_reservation_email(res_doc, room))
+    )
+    for action, follow_up in follow_ups:
+        try:
+            await follow_up
+        except Exception:
+            logger.exception(f"Failed to {action} for reservation {reservation_id}")
     
     # Return clean response without MongoDB _id
     clean_response = {k: v for k, v in res_doc.items() if k != '_id'}
@@ -110,23 +125,92 @@ async def check_reservation(booking_code: str = None, email: str = None):
     return reservations
 
 # Admin routes
-@router.get("/admin/reservations")
-async def get_all_reservations(
+def reservation_query(
     status: str = None,
     start_date: str = None,
     end_date: str = None,
-    user: dict = Depends(require_admin)
-):
+    stay_from: str = None,
+    stay_to: str = None,
+    room_type_id: str = None,
+    promo_code: str = None
+) -> dict:
+    """
+    Filters shared by the reservation list and the reservation export.
+    start_date/end_date keep stays inside the range; stay_from/stay_to match
+    any stay with a night in [stay_from, stay_to).
+    """
     query = {}
     if status:
         query["status"] = status
+    if room_type_id:
+        query["room_type_id"] = room_type_id
+    if promo_code:
+        query["promo_code"] = promo_code.upper()
     if start_date:
         query["check_in"] = {"$gte": start_date}
     if end_date:
         query["check_out"] = {"$lte": end_date}
+    if stay_to:
+        query.setdefault("check_in", {})["$lt"] = stay_to
+    if stay_from:
+        query.setdefault("check_out", {})["$gt"] = stay_from
+    return query
+
+async def count_reservations(query: dict) -> int:
+    """Cheap total for paging UIs: collection metadata when unfiltered, else a count capped at COUNT_LIMIT."""
+    if not query:
+        return await db.reservations.estimated_document_count()
+    return await db.reservations.count_documents(query, limit=COUNT_LIMIT)
+
+@router.get("/admin/reservations")
+async def get_all_reservations(
+    request: Request,
+    status: str = None,
+    start_date: str = None,
+    end_date: str = None,
+    stay_from: str = None,
+    stay_to: str = None,
+    room_type_id: str = None,
+    promo_code: str = None,
+    limit: int = None,
+    after: str = None,
+    output_format: str = Query(None, alias="format"),
+    user: dict = Depends(require_admin)
+):
+    query = reservation_query(status, start_date, end_date, stay_from, stay_to, room_type_id, promo_code)
     
-    reservations = await db.reservations.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    return reservations
+    ndjson = wants_ndjson(request, output_format)
+    sort = [("created_at", -1), ("reservation_id", -1)]
+    if limit or after:
+        (reservations, next_cursor), total = await asyncio.gather(
+            fetch_page(db.reservations, query, {"_id": 0}, sort, limit or MAX_PAGE_SIZE, after),
+            count_reservations(query)
+        )
+        headers = {"X-Total-Count": str(total)}
+        if query and total >= COUNT_LIMIT:
+            # At least this many match; the exact figure was not counted
+            headers["X-Total-Count-Capped"] = "true"
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+        return stream_documents(reservations, ndjson, headers)
+    
+    return stream_documents(db.reservations.find(query, {"_id": 0}).sort(sort), ndjson)
+
+@router.get("/admin/exports/reservations")
+async def export_reservations(
+    status: str = None,
+    start_date: str = None,
+    end_date: str = None,
+    stay_from: str = None,
+    stay_to: str = None,
+    room_type_id: str = None,
+    promo_code: str = None,
+    output_format: str = Query("csv", alias="format"),
+    user: dict = Depends(require_admin)
+):
+    query = reservation_query(status, start_date, end_date, stay_from, stay_to, room_type_id, promo_code)
+    cursor = db.reservations.find(query, {"_id": 0}).sort([("created_at", -1), ("reservation_id", -1)])
+    return await export_documents(cursor, RESERVATION_COLUMNS, "reservations", output_format)
 
 @router.put("/admin/reservations/{reservation_id}/status")
 async def update_reservation_status(reservation_id: str, status: str, user: dict = Depends(require_admin)):
@@ -134,10 +218,14 @@ async def update_reservation_status(reservation_id: str, status: str, user: dict
     if status not in valid_statuses:
         raise HTTPException(status_code=400, detail="Invalid status")
     
-    result = await db.reservations.update_one(
+    # The previous document tells us which transition happened, for the daily stats
+    previous = await db.reservations.find_one_and_update(
         {"reservation_id": reservation_id},
-        {"$set": {"status": status, "updated_at": datetime.now(timezone.utc).isoformat()}}
+        {"$set": {"status": status, "updated_at": datetime.now(timezone.utc).isoformat()}},
+        projection=STATS_PROJECTION,
+        return_document=ReturnDocument.BEFORE
     )
-    if result.matched_count == 0:
+    if previous is None:
         raise HTTPException(status_code=404, detail="Reservation not found")
+    await record_status_change(previous, previous.get("status"), status)
     return {"message": "Status updated"}
@@ -1,8 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Query
+from datetime import datetime, timezone
+import uuid
+from pymongo import ReturnDocument
 
 from database import db
-from models.review import ReviewCreate, Review
+from models.review import ReviewCreate, Review, ReviewBulkVisibility
 from services.auth import require_admin
+from services.bootstrap import invalidate_bootstrap
+from services.inventory_calendar import parse_date, format_date
+from services.review_stats import (
+    HOTEL_SCOPE, REVIEW_STATS_PROJECTION, summarize,
+    review_room_type_id, record_review_created, record_visibility_change,
+    record_bulk_visibility_change, rebuild_review_stats
+)
+from services.streaming import fetch_page, stream_documents, wants_ndjson, MAX_PAGE_SIZE
 
 router = APIRouter(tags=["reviews"])
 
@@ -11,6 +22,19 @@ async def get_visible_reviews():
     reviews = await db.reviews.find({"is_visible": True}, {"_id": 0}).sort("created_at", -1).to_list(50)
     return reviews
 
+@router.get("/reviews/summary")
+async def get_review_summary(room_type_id: str = None):
+    """Review count, mean rating and 1-5 histogram for the hotel and each room type."""
+    if room_type_id:
+        return summarize(await db.review_stats.find_one({"scope": room_type_id}, {"_id": 0}))
+    docs = await db.review_stats.find({}, {"_id": 0}).to_list(None)
+    by_scope = {doc["scope"]: doc for doc in docs}
+    hotel = by_scope.pop(HOTEL_SCOPE, None)
+    return {
+        **summarize(hotel),
+        "room_types": [{"room_type_id": scope, **summarize(doc)} for scope, doc in by_scope.items()]
+    }
+
 @router.post("/reviews")
 async def create_review(review: ReviewCreate):
     review_doc = Review(
@@ -19,23 +43,100 @@ async def create_review(review: ReviewCreate):
         rating=min(max(review.rating, 1), 5),
         comment=review.comment,
         reservation_id=review.reservation_id,
+        room_type_id=await review_room_type_id(review.reservation_id),
         is_visible=False
     ).model_dump()
     
     await db.reviews.insert_one(review_doc)
+    await record_review_created(review_doc)
     return {"message": "Review submitted for approval"}
 
+def review_query(is_visible: bool = None, rating: int = None, start_date: str = None, end_date: str = None) -> dict:
+    query = {}
+    if is_visible is not None:
+        query["is_visible"] = is_visible
+    if rating is not None:
+        query["rating"] = rating
+    if start_date or end_date:
+        query["created_at"] = {}
+        if start_date:
+            query["created_at"]["$gte"] = start_date
+        if end_date:
+            # created_at is a full timestamp, so the end day is included up to midnight
+            query["created_at"]["$lt"] = format_date(parse_date(end_date) + 1)
+    return query
+
 @router.get("/admin/reviews")
-async def get_all_reviews(user: dict = Depends(require_admin)):
-    reviews = await db.reviews.find({}, {"_id": 0}).sort("created_at", -1).to_list(100)
-    return reviews
+async def get_all_reviews(
+    request: Request,
+    is_visible: bool = None,
+    rating: int = None,
+    start_date: str = None,
+    end_date: str = None,
+    limit: int = None,
+    after: str = None,
+    output_format: str = Query(None, alias="format"),
+    user: dict = Depends(require_admin)
+):
+    """
+    Moderation queue, newest first. Without `limit`/`after` the newest 100 are
+    returned as before; with them, keyset pages carry X-Next-Cursor.
+    """
+    query = review_query(is_visible, rating, start_date, end_date)
+    ndjson = wants_ndjson(request, output_format)
+    sort = [("created_at", -1), ("review_id", -1)]
+    if limit or after:
+        reviews, next_cursor = await fetch_page(db.reviews, query, {"_id": 0}, sort, limit or MAX_PAGE_SIZE, after)
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+        return stream_documents(reviews, ndjson, headers)
+    
+    return stream_documents(db.reviews.find(query, {"_id": 0}).sort(sort).limit(100), ndjson)
+
+@router.post("/admin/reviews/bulk-visibility")
+async def bulk_update_review_visibility(request: ReviewBulkVisibility, user: dict = Depends(require_admin)):
+    """Approve or hide many reviews with one update_many."""
+    review_ids = list(set(request.review_ids))
+    if not review_ids:
+        raise HTTPException(status_code=400, detail="No reviews selected")
+    if len(review_ids) > MAX_PAGE_SIZE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_PAGE_SIZE} reviews per request")
+    
+    # Only reviews that actually flip are tagged, so the stats can find exactly those afterwards
+    moderation_id = str(uuid.uuid4())
+    result = await db.reviews.update_many(
+        {"review_id": {"$in": review_ids}, "is_visible": {"$ne": request.is_visible}},
+        {"$set": {
+            "is_visible": request.is_visible,
+            "moderation_id": moderation_id,
+            "moderated_at": datetime.now(timezone.utc).isoformat()
+        }}
+    )
+    if result.modified_count:
+        changed = await db.reviews.find(
+            {"review_id": {"$in": review_ids}, "moderation_id": moderation_id}, REVIEW_STATS_PROJECTION
+        ).to_list(None)
+        await record_bulk_visibility_change(changed, request.is_visible)
+        invalidate_bootstrap()
+    return {"message": f"Updated {result.modified_count} reviews", "updated": result.modified_count}
 
 @router.put("/admin/reviews/{review_id}/visibility")
 async def toggle_review_visibility(review_id: str, is_visible: bool, user: dict = Depends(require_admin)):
-    result = await db.reviews.update_one(
+    # The previous visibility decides whether the stats move, so concurrent toggles count once
+    review = await db.reviews.find_one_and_update(
         {"review_id": review_id},
-        {"$set": {"is_visible": is_visible}}
+        {"$set": {"is_visible": is_visible}},
+        projection=REVIEW_STATS_PROJECTION,
+        return_document=ReturnDocument.BEFORE
     )
-    if result.matched_count == 0:
+    if review is None:
         raise HTTPException(status_code=404, detail="Review not found")
+    await record_visibility_change(review, review.get("is_visible", False), is_visible)
+    invalidate_bootstrap()
     return {"message": "Review visibility updated"}
+
+@router.post("/admin/reviews/stats/rebuild")
+async def rebuild_review_summary(user: dict = Depends(require_admin)):
+    scopes = await rebuild_review_stats()
+    if scopes is None:
+        raise HTTPException(status_code=409, detail="Review stats are already being rebuilt")
+    return {"message": f"Rebuilt review stats for {scopes} scopes"}
@@ -1,10 +1,17 @@
-from fastapi import APIRouter, HTTPException, Depends
-from datetime import datetime, timezone, timedelta
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from datetime import datetime, timezone, date
 import uuid
+from pymongo import UpdateOne
 
 from database import db
 from models.room import RoomType, RoomInventory, BulkUpdateRequest
 from services.auth import require_admin
+from services.availability import search_availability, search_flexible
+from services.bootstrap import invalidate_bootstrap
+from services.inventory_calendar import inventory_calendar, parse_date, format_date
+from services.pricing import quote_stay
+from services.exports import export_documents, INVENTORY_COLUMNS
+from services.streaming import fetch_page, stream_documents, wants_ndjson, MAX_PAGE_SIZE
 
 router = APIRouter(tags=["rooms"])
 
@@ -26,6 +33,7 @@ async def get_room(room_type_id: str):
 async def create_room(room: RoomType, user: dict = Depends(require_admin)):
     room_doc = room.model_dump()
     await db.room_types.insert_one(room_doc)
+    invalidate_bootstrap()
     # Exclude _id from response (MongoDB adds it during insert)
     room_doc.pop("_id", None)
     return room_doc
@@ -36,6 +44,7 @@ async def update_room(room_type_id: str, room: dict, user: dict = Depends(requir
     result = await db.room_types.update_one({"room_type_id": room_type_id}, {"$set": room})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Room not found")
+    invalidate_bootstrap()
     return {"message": "Room updated"}
 
 @router.delete("/admin/rooms/{room_type_id}")
@@ -46,19 +55,42 @@ async def delete_room(room_type_id: str, user: dict = Depends(require_admin)):
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Room not found")
+    invalidate_bootstrap()
     return {"message": "Room deleted"}
 
 # Inventory routes
 @router.get("/inventory")
-async def get_inventory(room_type_id: str = None, start_date: str = None, end_date: str = None):
+async def get_inventory(
+    request: Request,
+    room_type_id: str = None,
+    start_date: str = None,
+    end_date: str = None,
+    limit: int = None,
+    after: str = None,
+    output_format: str = Query(None, alias="format")
+):
+    ndjson = wants_ndjson(request, output_format)
     query = {}
     if room_type_id:
         query["room_type_id"] = room_type_id
     if start_date and end_date:
         query["date"] = {"$gte": start_date, "$lte": end_date}
     
-    inventory = await db.room_inventory.find(query, {"_id": 0}).to_list(1000)
-    return inventory
+    # Keyset pages are bounded, so they are fetched whole to report the next cursor up front
+    if limit or after:
+        inventory, next_cursor = await fetch_page(
+            db.room_inventory, query, {"_id": 0, "holds": 0},
+            [("room_type_id", 1), ("date", 1)], limit or MAX_PAGE_SIZE, after
+        )
+        return stream_documents(inventory, ndjson, {"X-Next-Cursor": next_cursor} if next_cursor else None)
+    
+    if start_date and end_date:
+        start, end = parse_date(start_date), parse_date(end_date)
+        room_type_ids = [room_type_id] if room_type_id else await inventory_calendar.room_type_ids()
+        calendars = await inventory_calendar.get_many(room_type_ids, start, end + 1)
+        return stream_documents((row for rid in room_type_ids for row in calendars[rid].rows(start, end)), ndjson)
+    
+    return stream_documents(db.room_inventory.find(query, {"_id": 0, "holds": 0}), ndjson)
 
 @router.post("/admin/inventory")
 async def create_inventory(inventory: RoomInventory, user: dict = Depends(require_admin)):
@@ -75,82 +107,107 @@ async def create_inventory(inventory: RoomInventory, user: dict = Depends(requir
     else:
         await db.room_inventory.insert_one(inventory.model_dump())
     
+    inventory_calendar.invalidate(inventory.room_type_id)
+    invalidate_bootstrap()
     return inventory.model_dump()
 
 @router.post("/admin/inventory/bulk-update")
 async def bulk_update_inventory(request: BulkUpdateRequest, user: dict = Depends(require_admin)):
-    start = datetime.strptime(request.start_date, "%Y-%m-%d")
-    end = datetime.strptime(request.end_date, "%Y-%m-%d")
+    room_type_ids = list(dict.fromkeys(request.room_type_ids + ([request.room_type_id] if request.room_type_id else [])))
+    if not room_type_ids:
+        raise HTTPException(status_code=400, detail="room_type_id or room_type_ids is required")
+    if request.weekdays is not None and any(day not in range(7) for day in request.weekdays):
+        raise HTTPException(status_code=400, detail="Weekdays must be between 0 (Monday) and 6 (Sunday)")
+    if any(day not in range(7) for day in request.weekday_rates):
+        raise HTTPException(status_code=400, detail="Weekday rates must be keyed 0 (Monday) to 6 (Sunday)")
     
-    room = await db.room_types.find_one({"room_type_id": request.room_type_id}, {"_id": 0})
-    if not room:
+    start, end = parse_date(request.start_date), parse_date(request.end_date)
+    
+    rooms = await db.room_types.find(
+        {"room_type_id": {"$in": room_type_ids}},
+        {"_id": 0, "room_type_id": 1, "base_price": 1}
+    ).to_list(None)
+    if len(rooms) != len(room_type_ids):
         raise HTTPException(status_code=404, detail="Room type not found")
     
-    current = start
+    weekdays = set(range(7) if request.weekdays is None else request.weekdays)
+    operations = []
     updated_count = 0
-    while current <= end:
-        date_str = current.strftime("%Y-%m-%d")
-        update_fields = {}
+    for ordinal in range(start, end + 1):
+        weekday = date.fromordinal(ordinal).weekday()
+        if weekday not in weekdays:
+            continue
         
+        update_fields = {}
         if request.allotment is not None:
             update_fields["allotment"] = request.allotment
-        if request.rate is not None:
-            update_fields["rate"] = request.rate
+        rate = request.weekday_rates.get(weekday, request.rate)
+        if rate is not None:
+            update_fields["rate"] = rate
         if request.is_closed is not None:
             update_fields["is_closed"] = request.is_closed
         
-        if update_fields:
-            existing = await db.room_inventory.find_one({
-                "room_type_id": request.room_type_id,
-                "date": date_str
-            }, {"_id": 0})
-            
-            if existing:
-                await db.room_inventory.update_one(
-                    {"inventory_id": existing["inventory_id"]},
-                    {"$set": update_fields}
-                )
-            else:
-                new_inventory = {
-                    "inventory_id": str(uuid.uuid4()),
-                    "room_type_id": request.room_type_id,
-                    "date": date_str,
-                    "allotment": request.allotment if request.allotment is not None else 5,
-                    "rate": request.rate if request.rate is not None else room.get("base_price", 500000),
-                    "is_closed": request.is_closed if request.is_closed is not None else False
-                }
-                await db.room_inventory.insert_one(new_inventory)
-            
-            updated_count += 1
+        if not update_fields:
+            continue
         
-        current += timedelta(days=1)
+        date_str = format_date(ordinal)
+        for room in rooms:
+            defaults = {
+                "inventory_id": str(uuid.uuid4()),
+                "allotment": 5,
+                "rate": room.get("base_price", 500000),
+                "is_closed": False
+            }
+            operations.append(UpdateOne(
+                {"room_type_id": room["room_type_id"], "date": date_str},
+                {"$set": update_fields, "$setOnInsert": {k: v for k, v in defaults.items() if k not in update_fields}},
+                upsert=True
+            ))
+        updated_count += 1
+    
+    if operations:
+        await db.room_inventory.bulk_write(operations, ordered=False)
     
-    return {"message": f"Updated {updated_count} days"}
+    for room_type_id in room_type_ids:
+        inventory_calendar.invalidate(room_type_id)
+    invalidate_bootstrap()
+    
+    if len(room_type_ids) == 1:
+        return {"message": f"Updated {updated_count} days"}
+    return {"message": f"Updated {updated_count} days for {len(room_type_ids)} room types"}
+
+@router.get("/admin/exports/inventory")
+async def export_inventory(
+    room_type_id: str = None,
+    start_date: str = None,
+    end_date: str = None,
+    output_format: str = Query("csv", alias="format"),
+    user: dict = Depends(require_admin)
+):
+    query = {}
+    if room_type_id:
+        query["room_type_id"] = room_type_id
+    if start_date or end_date:
+        query["date"] = {}
+        if start_date:
+            query["date"]["$gte"] = start_date
+        if end_date:
+            query["date"]["$lte"] = end_date
+    cursor = db.room_inventory.find(query, {"_id": 0, "holds": 0}).sort([("room_type_id", 1), ("date", 1)])
+    return await export_documents(cursor, INVENTORY_COLUMNS, "inventory", output_format)
 
 # Availability
 @router.get("/availability")
 async def check_availability(check_in: str, check_out: str):
-    rooms = await db.room_types.find({"is_active": True}, {"_id": 0}).to_list(100)
-    available_rooms = []
-    
-    for room in rooms:
-        inventory = await db.room_inventory.find({
-            "room_type_id": room["room_type_id"],
-            "date": {"$gte": check_in, "$lt": check_out}
-        }, {"_id": 0}).to_list(100)
-        
-        min_rate = room.get("base_price", 500000)
-        is_available = True
-        
-        if inventory:
-            for inv in inventory:
-                if inv.get("is_closed", False) or inv.get("allotment", 0) <= 0:
-                    is_available = False
-                    break
-                min_rate = min(min_rate, inv.get("rate", min_rate))
-        
-        if is_available:
-            room["available_rate"] = min_rate
-            available_rooms.append(room)
-    
-    return available_rooms
+    return await search_availability(check_in, check_out)
+
+@router.get("/availability/flexible")
+async def check_flexible_availability(start_date: str, end_date: str, nights: int, limit: int = 3):
+    return await search_flexible(start_date, end_date, nights, min(max(limit, 1), 31))
+
+@router.get("/quote")
+async def get_quote(room_type_id: str, check_in: str, check_out: str, promo_code: str = ""):
+    room = await db.room_types.find_one({"room_type_id": room_type_id, "is_active": True}, {"_id": 0})
+    if not room:
+        raise HTTPException(status_code=404, detail="Room not found")
+    return await quote_stay(room, check_in, check_out, promo_code)
@@ -3,7 +3,11 @@ from starlette.middleware.cors import CORSMiddleware
 import logging
 
 from config import CORS_ORIGINS
-from database import close_db
+from database import close_db, ensure_indexes
+from services.compression import CompressionMiddleware
+from services.outbox import email_outbox
+from services.review_stats import ensure_review_stats
+from services.stats import ensure_daily_stats
 from routes import (
     auth_router,
     rooms_router,
@@ -44,6 +48,9 @@ async def root():
 # Include API router in main app
 app.include_router(api_router)
 
+# Compress responses; precompressed cached payloads pass through as they are
+app.add_middleware(CompressionMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -51,8 +58,17 @@ app.add_middleware(
     allow_origins=CORS_ORIGINS,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count", "X-Total-Count-Capped", "Idempotent-Replayed"],
 )
 
+@app.on_event("startup")
+async def create_db_indexes():
+    await ensure_indexes()
+    await ensure_daily_stats()
+    await ensure_review_stats()
+    email_outbox.start()
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await email_outbox.stop()
     await close_db()
@@ -1,7 +1,14 @@
 from services.auth import hash_password, verify_password, create_token, get_current_user, require_admin
 from services.email import send_reservation_email, send_password_reset_email
+from services.availability import search_availability
+from services.pricing import quote_stay
+from services.streaming import stream_documents, fetch_page
+from services.stats import rebuild_daily_stats
+from services.review_stats import rebuild_review_stats
 
 __all__ = [
     "hash_password", "verify_password", "create_token", "get_current_user", "require_admin",
-    "send_reservation_email", "send_password_reset_email"
+    "send_reservation_email", "send_password_reset_email",
+    "search_availability", "quote_stay",
+    "stream_documents", "fetch_page", "rebuild_daily_stats", "rebuild_review_stats"
 ]
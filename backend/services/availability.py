@@ -0,0 +1,101 @@
+import numpy as np
+from fastapi import HTTPException
+
+from database import db
+from services.inventory_calendar import inventory_calendar, parse_date, format_date, RoomCalendar
+from services.pricing import DEFAULT_BASE_PRICE, MAX_STAY_NIGHTS
+
+MAX_FLEXIBLE_WINDOW_DAYS = 366
+
+
+async def search_availability(check_in: str, check_out: str) -> list:
+    """
+    Return every active room type bookable for the whole stay.
+
+    Nightly inventory comes from the in-process calendar, so a warm search
+    costs a single room_types query regardless of how many room types exist.
+    The subtotal and starting rate are reduced straight from the calendar
+    arrays without building a per-night list.
+    """
+    start, end = parse_date(check_in), parse_date(check_out)
+    if end - start > MAX_STAY_NIGHTS:
+        raise HTTPException(status_code=400, detail=f"Stay cannot exceed {MAX_STAY_NIGHTS} nights")
+    rooms = await db.room_types.find({"is_active": True}, {"_id": 0}).to_list(None)
+    if not rooms:
+        return []
+
+    calendars = await inventory_calendar.get_many([room["room_type_id"] for room in rooms], start, end)
+
+    available_rooms = []
+    for room in rooms:
+        present, allotment, rate, closed = calendars[room["room_type_id"]].window(start, end)
+        if np.any(present & (closed | (allotment <= 0))):
+            continue
+
+        # Same rules as stay_breakdown: base_price fills nights without an explicit rate
+        base_price = room.get("base_price", DEFAULT_BASE_PRICE)
+        explicit = ~np.isnan(rate)
+        room["available_rate"] = min(base_price, float(rate[explicit].min())) if explicit.any() else base_price
+        room["total_rate"] = float(np.where(explicit, rate, base_price).sum())
+        available_rooms.append(room)
+
+    return available_rooms
+
+
+def cheapest_stays(calendar: RoomCalendar, base_price: float, start: int, end: int, nights: int, limit: int) -> list:
+    """
+    Cheapest bookable check-in dates for a fixed stay length inside [start, end).
+
+    Prefix sums over the nightly rates and blocked flags give every candidate
+    stay's total and blocked-night count in one vectorized pass.
+    """
+    present, allotment, rate, closed = calendar.window(start, end)
+    rates = np.where(np.isnan(rate), base_price, rate)
+    blocked = present & (closed | (allotment <= 0))
+
+    rate_sums = np.concatenate(([0.0], np.cumsum(rates)))
+    blocked_sums = np.concatenate(([0], np.cumsum(blocked)))
+    totals = rate_sums[nights:] - rate_sums[:-nights]
+    bookable = np.flatnonzero((blocked_sums[nights:] - blocked_sums[:-nights]) == 0)
+
+    best = bookable[np.argsort(totals[bookable], kind="stable")[:limit]]
+    return [
+        {
+            "check_in": format_date(start + int(i)),
+            "check_out": format_date(start + int(i) + nights),
+            "total_rate": float(totals[i]),
+            "rate_per_night": float(totals[i]) / nights
+        }
+        for i in best
+    ]
+
+
+async def search_flexible(start_date: str, end_date: str, nights: int, limit: int) -> list:
+    """
+    For every active room type, the `limit` cheapest stays of `nights` nights
+    that check in on or after start_date and check out on or before end_date.
+    """
+    start, end = parse_date(start_date), parse_date(end_date)
+    if nights <= 0 or start + nights > end:
+        raise HTTPException(status_code=400, detail="Stay length does not fit in the date window")
+    if end - start > MAX_FLEXIBLE_WINDOW_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date window cannot exceed {MAX_FLEXIBLE_WINDOW_DAYS} days")
+
+    rooms = await db.room_types.find({"is_active": True}, {"_id": 0}).to_list(None)
+    if not rooms:
+        return []
+
+    calendars = await inventory_calendar.get_many([room["room_type_id"] for room in rooms], start, end)
+
+    results = []
+    for room in rooms:
+        stays = cheapest_stays(
+            calendars[room["room_type_id"]],
+            room.get("base_price", DEFAULT_BASE_PRICE),
+            start, end, nights, limit
+        )
+        if stays:
+            room["stays"] = stays
+            results.append(room)
+
+    return results
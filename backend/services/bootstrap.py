@@ -0,0 +1,78 @@
+import asyncio
+import json
+from datetime import datetime, timezone
+
+from cachetools import TTLCache
+
+from database import db
+from services.content_cache import Payload, get_content_payload
+from services.inventory_calendar import inventory_calendar
+from services.pricing import DEFAULT_BASE_PRICE
+from services.settings import get_hotel_settings
+
+# Bounds staleness on other workers, which never see this process's invalidations
+BOOTSTRAP_TTL_SECONDS = 60
+# Starting rates are the lowest price over this many nights from today
+STARTING_RATE_DAYS = 30
+
+_bundles = TTLCache(maxsize=64, ttl=BOOTSTRAP_TTL_SECONDS)
+_generation = 0
+
+
+def _dumps(value) -> bytes:
+    return json.dumps(value, separators=(",", ":"), default=str).encode()
+
+
+async def _rooms_with_starting_rates(today: int) -> list:
+    rooms = await db.room_types.find({"is_active": True}, {"_id": 0}).to_list(100)
+    calendars = await inventory_calendar.get_many([room["room_type_id"] for room in rooms], today, today + STARTING_RATE_DAYS)
+    for room in rooms:
+        base_price = room.get("base_price", DEFAULT_BASE_PRICE)
+        explicit_rate = calendars[room["room_type_id"]].min_rate(today, today + STARTING_RATE_DAYS)
+        room["starting_rate"] = base_price if explicit_rate is None else min(base_price, explicit_rate)
+    return rooms
+
+
+async def get_bootstrap_payload(page: str) -> Payload:
+    """
+    One JSON body with everything a public page needs for first paint:
+    the page's and global content, active rooms with starting rates,
+    visible reviews and the hotel settings.
+
+    The parts are fetched concurrently and the serialized result is cached
+    until content, rooms, rates or reviews change in this process.
+    """
+    today = datetime.now(timezone.utc).date().toordinal()
+    key = (page, today)
+    payload = _bundles.get(key)
+    if payload is not None:
+        return payload
+
+    generation = _generation
+    content, global_content, rooms, reviews, settings = await asyncio.gather(
+        get_content_payload(page),
+        get_content_payload("global"),
+        _rooms_with_starting_rates(today),
+        db.reviews.find({"is_visible": True}, {"_id": 0}).sort("created_at", -1).to_list(50),
+        get_hotel_settings()
+    )
+    # Content bodies are already serialized, so they are spliced in as bytes
+    payload = Payload(b"".join([
+        b'{"page":', _dumps(page),
+        b',"content":', content.body,
+        b',"global":', global_content.body,
+        b',"rooms":', _dumps(rooms),
+        b',"reviews":', _dumps(reviews),
+        b',"settings":', _dumps(settings),
+        b"}"
+    ]))
+    # Something was invalidated while we were gathering; serve this once but don't cache it
+    if generation == _generation:
+        _bundles[key] = payload
+    return payload
+
+
+def invalidate_bootstrap():
+    global _generation
+    _generation += 1
+    _bundles.clear()
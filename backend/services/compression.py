@@ -0,0 +1,133 @@
+import gzip
+import zlib
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+
+# Below this size the compressed body plus headers is rarely smaller
+MIN_COMPRESS_BYTES = 1024
+# Per-request compression favours speed; cached payloads are compressed once, so harder
+STREAM_GZIP_LEVEL = 5
+STREAM_BROTLI_QUALITY = 4
+CACHED_GZIP_LEVEL = 9
+CACHED_BROTLI_QUALITY = 9
+# Already compressed formats gain nothing from a second pass
+SKIP_CONTENT_TYPES = ("image/", "video/", "audio/", "application/zip", "application/vnd.openxmlformats")
+
+SUPPORTED_ENCODINGS = ("br", "gzip")
+
+
+def choose_encoding(accept_encoding: str):
+    """Best encoding the client accepts, preferring brotli, or None for identity."""
+    accepted = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    for encoding in SUPPORTED_ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """One-shot compression at the cached-payload levels."""
+    if encoding == "br":
+        return brotli.compress(body, quality=CACHED_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=CACHED_GZIP_LEVEL, mtime=0)
+
+
+class _StreamCompressor:
+    def __init__(self, encoding: str):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=STREAM_BROTLI_QUALITY)
+        else:
+            self._brotli = None
+            self._gzip = zlib.compressobj(STREAM_GZIP_LEVEL, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def chunk(self, data: bytes) -> bytes:
+        # Flushed per chunk so streamed exports keep arriving incrementally
+        if self._brotli:
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._gzip.compress(data) + self._gzip.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        if self._brotli:
+            return self._brotli.finish()
+        return self._gzip.flush()
+
+
+class CompressionMiddleware:
+    """
+    Negotiate gzip/brotli for every HTTP response, streamed ones included.
+
+    Responses that already carry a Content-Encoding (the precompressed
+    cached payloads) pass through untouched, as do small bodies and
+    formats that are compressed already.
+    """
+
+    def __init__(self, app, minimum_size: int = MIN_COMPRESS_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:
+                headers = MutableHeaders(raw=start_message["headers"])
+                if (
+                    "content-encoding" in headers
+                    or headers.get("content-type", "").startswith(SKIP_CONTENT_TYPES)
+                    or (not more_body and len(body) < self.minimum_size)
+                ):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+
+                compressor = _StreamCompressor(encoding)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    body = compressor.chunk(body) + compressor.finish()
+                    headers["Content-Length"] = str(len(body))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(start_message)
+
+            data = compressor.chunk(body)
+            if not more_body:
+                data += compressor.finish()
+            await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
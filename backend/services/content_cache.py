@@ -0,0 +1,75 @@
+import hashlib
+import json
+
+from cachetools import TTLCache
+from fastapi import Response
+
+from database import db
+from services.compression import MIN_COMPRESS_BYTES, choose_encoding, compress
+
+# Other workers pick up content edits after at most this long
+CONTENT_TTL_SECONDS = 300
+# Browsers keep the copy but check the ETag on every load, so edits show up at once
+CONTENT_CACHE_CONTROL = "public, no-cache"
+
+_payloads = TTLCache(maxsize=256, ttl=CONTENT_TTL_SECONDS)
+_generation = 0
+
+
+class Payload:
+    """
+    A serialized JSON body with its ETag and, once asked for, its compressed forms.
+
+    The ETag is weak so the same tag validates the plain, gzip and brotli bodies.
+    """
+    __slots__ = ("body", "etag", "_encoded")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        self._encoded = {}
+
+    def encoded(self, encoding: str) -> bytes:
+        data = self._encoded.get(encoding)
+        if data is None:
+            data = self._encoded[encoding] = compress(self.body, encoding)
+        return data
+
+
+def payload_response(payload: Payload, if_none_match: str = None, accept_encoding: str = "") -> Response:
+    """The cached body with its ETag, or an empty 304 when the client already has it."""
+    headers = {"ETag": payload.etag, "Cache-Control": CONTENT_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if if_none_match and payload.etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    encoding = choose_encoding(accept_encoding or "") if len(payload.body) >= MIN_COMPRESS_BYTES else None
+    if encoding is None:
+        return Response(content=payload.body, media_type="application/json", headers=headers)
+    headers["Content-Encoding"] = encoding
+    return Response(content=payload.encoded(encoding), media_type="application/json", headers=headers)
+
+
+async def get_content_payload(page: str = None) -> Payload:
+    """
+    Serialized JSON body and ETag for one page's content, or for every page.
+    Built once per page and served from memory until the content changes or the TTL passes.
+    """
+    payload = _payloads.get(page)
+    if payload is not None:
+        return payload
+
+    generation = _generation
+    if page is None:
+        docs = await db.site_content.find({}, {"_id": 0}).to_list(500)
+    else:
+        docs = await db.site_content.find({"page": page}, {"_id": 0}).to_list(100)
+    payload = Payload(json.dumps(docs, separators=(",", ":"), default=str).encode())
+    # Content changed while we were reading; serve this once but don't cache it
+    if generation == _generation:
+        _payloads[page] = payload
+    return payload
+
+
+def invalidate_content():
+    global _generation
+    _generation += 1
+    _payloads.clear()
@@ -0,0 +1,98 @@
+import asyncio
+import csv
+import io
+import os
+import re
+import tempfile
+from datetime import datetime, timezone
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse, FileResponse
+from openpyxl import Workbook
+from starlette.background import BackgroundTask
+
+from services.streaming import STREAM_CHUNK_BYTES
+
+RESERVATION_COLUMNS = [
+    "booking_code", "reservation_id", "created_at", "status",
+    "guest_name", "guest_email", "guest_phone", "guests",
+    "room_type_id", "room_type_name", "check_in", "check_out", "nights",
+    "rate_per_night", "discount_amount", "total_amount", "promo_code", "special_requests"
+]
+INVENTORY_COLUMNS = ["room_type_id", "date", "allotment", "rate", "is_closed"]
+EXPORT_FORMATS = ("csv", "xlsx")
+XLSX_BATCH_ROWS = 1000
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+PLAIN_NUMBER = re.compile(r"[+-][0-9][0-9 ().-]*")
+
+
+def _cell(value):
+    # Guest-entered text must not be evaluated as a formula by spreadsheet apps;
+    # a leading + or - is left alone when the rest is a number such as a phone number
+    if isinstance(value, str) and (value[:1] in ("=", "@") or (value[:1] in ("+", "-") and not PLAIN_NUMBER.fullmatch(value))):
+        return "'" + value
+    return "" if value is None else value
+
+
+async def _csv_chunks(cursor, columns: list):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    async for doc in cursor:
+        writer.writerow([_cell(doc.get(column)) for column in columns])
+        if buffer.tell() >= STREAM_CHUNK_BYTES:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _append_rows(sheet, rows: list):
+    for row in rows:
+        sheet.append(row)
+
+
+async def _build_xlsx(cursor, columns: list, title: str) -> str:
+    """
+    Write the cursor into a write-only workbook in a worker thread.
+    Rows are handed over in batches, so memory stays bounded by the batch size.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    sheet.append(columns)
+
+    batch = []
+    async for doc in cursor:
+        batch.append([_cell(doc.get(column)) for column in columns])
+        if len(batch) >= XLSX_BATCH_ROWS:
+            await asyncio.to_thread(_append_rows, sheet, batch)
+            batch = []
+    if batch:
+        await asyncio.to_thread(_append_rows, sheet, batch)
+
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        await asyncio.to_thread(workbook.save, path)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+async def export_documents(cursor, columns: list, name: str, export_format: str = "csv"):
+    """Respond with the cursor's documents as a streamed CSV or an XLSX attachment."""
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    filename = f"{name}-{datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')}.{export_format}"
+
+    if export_format == "xlsx":
+        path = await _build_xlsx(cursor, columns, name)
+        return FileResponse(path, media_type=XLSX_MEDIA_TYPE, filename=filename, background=BackgroundTask(os.remove, path))
+
+    return StreamingResponse(
+        _csv_chunks(cursor, columns),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
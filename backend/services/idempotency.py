@@ -0,0 +1,75 @@
+import hashlib
+import json
+from datetime import datetime, timezone, timedelta
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from pymongo.errors import DuplicateKeyError
+
+from database import db
+
+# Stored responses are replayed for this long, then removed by the TTL index
+IDEMPOTENCY_TTL = timedelta(hours=24)
+# A key left "pending" longer than this belongs to a request that died mid-flight
+PENDING_TIMEOUT = timedelta(seconds=60)
+MAX_KEY_LENGTH = 255
+
+
+def _fingerprint(payload: dict) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+async def begin_request(scope: str, key: str, payload: dict):
+    """
+    Reserve an Idempotency-Key before doing any work.
+
+    Returns None when the caller should handle the request, or the stored
+    response to send back unchanged when the key was already completed.
+    """
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+
+    now = datetime.now(timezone.utc)
+    fingerprint = _fingerprint(payload)
+    try:
+        await db.idempotency_keys.insert_one({
+            "scope": scope,
+            "key": key,
+            "fingerprint": fingerprint,
+            "state": "pending",
+            "started_at": now,
+            "expires_at": now + IDEMPOTENCY_TTL
+        })
+        return None
+    except DuplicateKeyError:
+        pass
+
+    existing = await db.idempotency_keys.find_one({"scope": scope, "key": key}, {"_id": 0})
+    if existing is None:
+        # Expired between the insert and the read; the retry will insert cleanly
+        raise HTTPException(status_code=409, detail="Request with this Idempotency-Key is being retried, try again")
+    if existing["fingerprint"] != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request")
+    if existing["state"] == "completed":
+        return JSONResponse(existing["response"], status_code=existing["status_code"], headers={"Idempotent-Replayed": "true"})
+
+    # Pending: take it over only if the original request has clearly been lost
+    result = await db.idempotency_keys.update_one(
+        {"scope": scope, "key": key, "state": "pending", "started_at": {"$lt": now - PENDING_TIMEOUT}},
+        {"$set": {"started_at": now}}
+    )
+    if result.modified_count == 0:
+        raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+    return None
+
+
+async def complete_request(scope: str, key: str, response: dict, status_code: int = 200):
+    await db.idempotency_keys.update_one(
+        {"scope": scope, "key": key},
+        {"$set": {"state": "completed", "response": response, "status_code": status_code}}
+    )
+
+
+async def abandon_request(scope: str, key: str):
+    """Forget a key whose request failed, so a retry runs it again."""
+    await db.idempotency_keys.delete_one({"scope": scope, "key": key, "state": "pending"})
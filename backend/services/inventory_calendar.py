@@ -0,0 +1,333 @@
+import asyncio
+import itertools
+import logging
+import random
+import time
+from datetime import date
+
+import numpy as np
+from fastapi import HTTPException
+from pymongo import UpdateOne
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+# How stale another worker's writes can look to this process, give or take one reload
+CALENDAR_TTL_SECONDS = 30
+# Each cached room expires somewhere in the last quarter of the TTL, so rooms loaded together refresh apart
+CALENDAR_TTL_JITTER = 0.25
+# Cached calendars hold this window around today; other ranges are read straight from Mongo
+CALENDAR_PAST_DAYS = 31
+CALENDAR_FUTURE_DAYS = 2 * 366
+
+_INVENTORY_PROJECTION = {"_id": 0, "inventory_id": 1, "room_type_id": 1, "date": 1, "allotment": 1, "rate": 1, "is_closed": 1}
+_versions = itertools.count(1)
+
+
+def parse_date(date_str: str) -> int:
+    """Convert a YYYY-MM-DD string into a proleptic ordinal day number."""
+    try:
+        return date.fromisoformat(date_str).toordinal()
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Invalid date: {date_str}")
+
+
+def format_date(ordinal: int) -> str:
+    return date.fromordinal(ordinal).isoformat()
+
+
+class RoomCalendar:
+    """
+    Inventory of one room type held as parallel arrays indexed by day offset
+    from `origin`. Nights without a room_inventory document have `present`
+    set to False and fall back to the room's base price with no allotment cap.
+    """
+
+    __slots__ = ("room_type_id", "origin", "present", "allotment", "rate", "closed", "inventory_ids", "version", "loaded_at")
+
+    def __init__(self, room_type_id: str, docs: list):
+        self.room_type_id = room_type_id
+        self.version = next(_versions)
+        self.loaded_at = time.monotonic()
+
+        ordinals = [date.fromisoformat(doc["date"]).toordinal() for doc in docs]
+        self.origin = min(ordinals) if ordinals else 0
+        size = (max(ordinals) - self.origin + 1) if ordinals else 0
+
+        self.present = np.zeros(size, dtype=bool)
+        self.allotment = np.zeros(size, dtype=np.int32)
+        self.rate = np.full(size, np.nan, dtype=np.float64)
+        self.closed = np.zeros(size, dtype=bool)
+        self.inventory_ids = [None] * size
+
+        for ordinal, doc in zip(ordinals, docs):
+            i = ordinal - self.origin
+            self.present[i] = True
+            self.allotment[i] = doc.get("allotment", 0)
+            if doc.get("rate") is not None:
+                self.rate[i] = doc["rate"]
+            self.closed[i] = bool(doc.get("is_closed", False))
+            self.inventory_ids[i] = doc.get("inventory_id")
+
+    def window(self, start: int, end: int) -> tuple:
+        """
+        Return (present, allotment, rate, closed) for ordinals [start, end),
+        padding days outside the loaded span as missing.
+        """
+        length = max(end - start, 0)
+        lo, hi = start - self.origin, end - self.origin
+        if lo >= 0 and hi <= len(self.present):
+            return self.present[lo:hi], self.allotment[lo:hi], self.rate[lo:hi], self.closed[lo:hi]
+
+        present = np.zeros(length, dtype=bool)
+        allotment = np.zeros(length, dtype=np.int32)
+        rate = np.full(length, np.nan, dtype=np.float64)
+        closed = np.zeros(length, dtype=bool)
+        src_lo, src_hi = max(lo, 0), min(hi, len(self.present))
+        if src_lo < src_hi:
+            dst = slice(src_lo - lo, src_hi - lo)
+            present[dst] = self.present[src_lo:src_hi]
+            allotment[dst] = self.allotment[src_lo:src_hi]
+            rate[dst] = self.rate[src_lo:src_hi]
+            closed[dst] = self.closed[src_lo:src_hi]
+        return present, allotment, rate, closed
+
+    def blocked_dates(self, start: int, end: int) -> list:
+        present, allotment, _, closed = self.window(start, end)
+        blocked = present & (closed | (allotment <= 0))
+        return [format_date(start + int(i)) for i in np.flatnonzero(blocked)]
+
+    def is_available(self, start: int, end: int) -> bool:
+        present, allotment, _, closed = self.window(start, end)
+        return not bool(np.any(present & (closed | (allotment <= 0))))
+
+    def min_rate(self, start: int, end: int):
+        """Lowest explicit nightly rate in [start, end), or None if there is none."""
+        _, _, rate, _ = self.window(start, end)
+        if rate.size == 0 or np.all(np.isnan(rate)):
+            return None
+        return float(np.nanmin(rate))
+
+    def nightly_rates(self, start: int, end: int, base_price: float) -> np.ndarray:
+        _, _, rate, _ = self.window(start, end)
+        return np.where(np.isnan(rate), base_price, rate)
+
+    def rows(self, start: int = None, end: int = None):
+        """Yield room_inventory documents for the stored nights in [start, end]."""
+        size = len(self.present)
+        lo = 0 if start is None else max(start - self.origin, 0)
+        hi = size if end is None else min(end - self.origin + 1, size)
+        for i in np.flatnonzero(self.present[lo:hi]) + lo:
+            rate = self.rate[i]
+            yield {
+                "inventory_id": self.inventory_ids[i],
+                "room_type_id": self.room_type_id,
+                "date": format_date(self.origin + int(i)),
+                "allotment": int(self.allotment[i]),
+                "rate": None if np.isnan(rate) else float(rate),
+                "is_closed": bool(self.closed[i])
+            }
+
+    def stored_dates(self, start: int, end: int) -> list:
+        """Dates in [start, end) that have a room_inventory document."""
+        present, _, _, _ = self.window(start, end)
+        return [format_date(start + int(i)) for i in np.flatnonzero(present)]
+
+    def adjust_allotment(self, start: int, end: int, delta: int):
+        """Apply an allotment change to the stored nights in [start, end)."""
+        lo, hi = max(start - self.origin, 0), min(end - self.origin, len(self.present))
+        if lo < hi:
+            nights = self.present[lo:hi]
+            self.allotment[lo:hi][nights] += delta
+        self.version = next(_versions)
+
+
+class InventoryCalendar:
+    """
+    In-process cache of RoomCalendar objects keyed by room_type_id.
+
+    Reads load every missing room type with a single indexed scan over the
+    dates in `window()`; ranges reaching outside it get an uncached calendar
+    of just that range. Expired rooms keep being served while one background
+    task reloads them, so a request only waits on rooms that are not cached
+    at all. Writes in this process either patch the arrays in place or
+    invalidate the room; writes from other workers become visible after
+    about CALENDAR_TTL_SECONDS.
+    """
+
+    def __init__(self, ttl: float = CALENDAR_TTL_SECONDS):
+        self.ttl = ttl
+        self._rooms = {}
+        self._expires = {}
+        self._refreshing = set()
+        self._tasks = set()
+        self._generations = {}
+        self._epoch = 0
+        self._room_type_ids = None
+        self._room_type_ids_loaded_at = 0.0
+
+    def _is_fresh(self, loaded_at: float) -> bool:
+        return time.monotonic() - loaded_at < self.ttl
+
+    def _generation(self, room_type_id: str) -> tuple:
+        return self._epoch, self._generations.get(room_type_id, 0)
+
+    @staticmethod
+    def window() -> tuple:
+        today = date.today().toordinal()
+        return today - CALENDAR_PAST_DAYS, today + CALENDAR_FUTURE_DAYS
+
+    async def _load(self, room_type_ids: list, start: int, end: int) -> dict:
+        docs_by_room = {room_type_id: [] for room_type_id in room_type_ids}
+        cursor = db.room_inventory.find(
+            {"room_type_id": {"$in": room_type_ids}, "date": {"$gte": format_date(start), "$lt": format_date(end)}},
+            _INVENTORY_PROJECTION
+        )
+        async for doc in cursor:
+            docs_by_room[doc["room_type_id"]].append(doc)
+        return {room_type_id: RoomCalendar(room_type_id, docs) for room_type_id, docs in docs_by_room.items()}
+
+    async def get_many(self, room_type_ids: list, start: int = None, end: int = None) -> dict:
+        """Calendars for `room_type_ids`, valid for nights [start, end) when given."""
+        lo, hi = self.window()
+        if start is not None and (start < lo or end > hi):
+            return await self._load(list(room_type_ids), start, end)
+
+        calendars = {}
+        missing = []
+        stale = []
+        now = time.monotonic()
+        for room_type_id in room_type_ids:
+            calendar = self._rooms.get(room_type_id)
+            if calendar is None:
+                missing.append(room_type_id)
+                continue
+            calendars[room_type_id] = calendar
+            if now >= self._expires.get(room_type_id, 0) and room_type_id not in self._refreshing:
+                stale.append(room_type_id)
+
+        if stale:
+            self._refreshing.update(stale)
+            task = asyncio.create_task(self._refresh(stale))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        if missing:
+            calendars.update(await self._load_window(missing))
+        return calendars
+
+    async def _load_window(self, room_type_ids: list) -> dict:
+        """Load `window()` for the rooms and cache each one nothing was written to meanwhile."""
+        lo, hi = self.window()
+        generations = {room_type_id: self._generation(room_type_id) for room_type_id in room_type_ids}
+        calendars = await self._load(room_type_ids, lo, hi)
+        for room_type_id, calendar in calendars.items():
+            # A write landed while we were loading; serve this result once but don't cache it
+            if self._generation(room_type_id) == generations[room_type_id]:
+                self._rooms[room_type_id] = calendar
+                self._expires[room_type_id] = time.monotonic() + self.ttl * (1 - CALENDAR_TTL_JITTER * random.random())
+        return calendars
+
+    async def _refresh(self, room_type_ids: list):
+        try:
+            await self._load_window(room_type_ids)
+        except Exception:
+            # The expired entries stay in place and the next read tries again
+            logger.exception(f"Failed to refresh inventory calendars for {len(room_type_ids)} room types")
+        finally:
+            self._refreshing.difference_update(room_type_ids)
+
+    async def get(self, room_type_id: str, start: int = None, end: int = None) -> RoomCalendar:
+        return (await self.get_many([room_type_id], start, end))[room_type_id]
+
+    async def room_type_ids(self) -> list:
+        """Every room_type_id that has at least one inventory document."""
+        if self._room_type_ids is None or not self._is_fresh(self._room_type_ids_loaded_at):
+            self._room_type_ids = set(await db.room_inventory.distinct("room_type_id"))
+            self._room_type_ids_loaded_at = time.monotonic()
+        return sorted(self._room_type_ids)
+
+    def _bump(self, room_type_id: str):
+        self._generations[room_type_id] = self._generations.get(room_type_id, 0) + 1
+
+    def invalidate(self, room_type_id: str = None):
+        if room_type_id is None:
+            self._rooms.clear()
+            self._room_type_ids = None
+            self._epoch += 1
+            return
+        self._rooms.pop(room_type_id, None)
+        self._bump(room_type_id)
+        if self._room_type_ids is not None:
+            self._room_type_ids.add(room_type_id)
+
+    async def claim_nights(self, room_type_id: str, start: int, end: int, reservation_id: str):
+        """
+        Take one room from every stored night of the stay, or none at all.
+
+        Every night of the stay gets a conditional decrement in one ordered
+        bulk_write, so nights created by another worker since our calendar
+        was loaded are covered too; nights without a document stay uncapped.
+        Each matched night is tagged with the reservation_id so that, if any
+        stored night was sold out in the meantime, exactly the nights we took
+        can be handed back. Call settle_nights once the reservation is stored
+        to drop the tags.
+        """
+        # If the room is reloaded while we write, the new arrays already include our decrement
+        cached = self._rooms.get(room_type_id)
+        try:
+            result = await db.room_inventory.bulk_write([
+                UpdateOne(
+                    {"room_type_id": room_type_id, "date": format_date(night), "allotment": {"$gt": 0}, "is_closed": {"$ne": True}},
+                    {"$inc": {"allotment": -1}, "$push": {"holds": reservation_id}}
+                )
+                for night in range(start, end)
+            ], ordered=True)
+            # A night created after the write makes this overcount, which only errs towards a 409
+            stored = await db.room_inventory.count_documents({
+                "room_type_id": room_type_id,
+                "date": {"$gte": format_date(start), "$lt": format_date(end)}
+            })
+        except Exception:
+            # Nights decremented before the failure are still tagged and can be handed back
+            await self.release_nights(room_type_id, start, end, reservation_id)
+            raise
+
+        if result.modified_count < stored:
+            await self.release_nights(room_type_id, start, end, reservation_id)
+            raise HTTPException(status_code=409, detail="Room is no longer available for the selected dates")
+
+        if (
+            cached is not None and self._rooms.get(room_type_id) is cached
+            and len(cached.stored_dates(start, end)) == stored
+        ):
+            cached.adjust_allotment(start, end, -1)
+            # A load that started before the write must not be cached over the patched arrays
+            self._bump(room_type_id)
+        else:
+            self.invalidate(room_type_id)
+
+    async def settle_nights(self, room_type_id: str, start: int, end: int, reservation_id: str):
+        await db.room_inventory.update_many(
+            {
+                "room_type_id": room_type_id,
+                "date": {"$gte": format_date(start), "$lt": format_date(end)},
+                "holds": reservation_id
+            },
+            {"$pull": {"holds": reservation_id}}
+        )
+
+    async def release_nights(self, room_type_id: str, start: int, end: int, reservation_id: str):
+        """Give back every night still tagged with reservation_id."""
+        await db.room_inventory.update_many(
+            {
+                "room_type_id": room_type_id,
+                "date": {"$gte": format_date(start), "$lt": format_date(end)},
+                "holds": reservation_id
+            },
+            {"$inc": {"allotment": 1}, "$pull": {"holds": reservation_id}}
+        )
+        self.invalidate(room_type_id)
+
+
+inventory_calendar = InventoryCalendar()
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import smtplib
+import uuid
+from datetime import datetime, timezone, timedelta
+from email.message import EmailMessage
+
+import resend
+from pymongo import UpdateOne
+
+from config import RESEND_API_KEY, SENDER_EMAIL, EMAIL_TRANSPORT, SMTP_HOST, SMTP_PORT
+from database import db
+
+resend.api_key = RESEND_API_KEY
+logger = logging.getLogger(__name__)
+
+# Resend accepts at most 100 messages per batch call
+BATCH_SIZE = 100
+POLL_SECONDS = 5
+MAX_ATTEMPTS = 8
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 6 * 3600
+# A batch still marked "sending" after this long belongs to a worker that died
+CLAIM_TIMEOUT = timedelta(minutes=5)
+
+
+class ResendTransport:
+    """Sends a whole batch with one Resend API call."""
+
+    def send(self, messages: list):
+        resend.Batch.send([
+            {"from": SENDER_EMAIL, "to": message["to"], "subject": message["subject"], "html": message["html"]}
+            for message in messages
+        ])
+
+
+class SmtpTransport:
+    """Plain SMTP, e.g. a local MailHog/aiosmtpd stand-in for development and tests."""
+
+    def __init__(self, host: str = SMTP_HOST, port: int = SMTP_PORT):
+        self.host = host
+        self.port = port
+
+    def send(self, messages: list):
+        with smtplib.SMTP(self.host, self.port, timeout=30) as smtp:
+            for message in messages:
+                email = EmailMessage()
+                email["From"] = SENDER_EMAIL
+                email["To"] = ", ".join(message["to"])
+                email["Subject"] = message["subject"]
+                email.set_content(message["html"], subtype="html")
+                smtp.send_message(email)
+
+
+TRANSPORTS = {"resend": ResendTransport, "smtp": SmtpTransport}
+
+
+def backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS))
+
+
+class EmailOutbox:
+    """
+    Durable queue of outgoing mail in the email_outbox collection.
+
+    Requests only insert a document. A background worker claims due messages
+    in batches, hands them to the transport in a thread and reschedules
+    failures with exponential backoff, so mail survives restarts and request
+    latency no longer depends on the mail provider.
+    """
+
+    def __init__(self, transport=None):
+        self.transport = transport
+        self._task = None
+        self._wake = asyncio.Event()
+
+    async def enqueue(self, to: list, subject: str, html: str, kind: str):
+        now = datetime.now(timezone.utc)
+        await db.email_outbox.insert_one({
+            "message_id": str(uuid.uuid4()),
+            "kind": kind,
+            "to": to,
+            "subject": subject,
+            "html": html,
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now
+        })
+        self._wake.set()
+
+    async def claim_batch(self) -> list:
+        """Mark up to BATCH_SIZE due messages as ours with a single claim token."""
+        now = datetime.now(timezone.utc)
+        due = {"$or": [
+            {"status": "pending", "next_attempt_at": {"$lte": now}},
+            {"status": "sending", "claimed_at": {"$lt": now - CLAIM_TIMEOUT}}
+        ]}
+        candidates = await db.email_outbox.find(due, {"_id": 0, "message_id": 1}).sort("next_attempt_at", 1).to_list(BATCH_SIZE)
+        if not candidates:
+            return []
+
+        claim = str(uuid.uuid4())
+        await db.email_outbox.update_many(
+            {"$and": [due, {"message_id": {"$in": [c["message_id"] for c in candidates]}}]},
+            {"$set": {"status": "sending", "claim": claim, "claimed_at": now}}
+        )
+        # Another worker may have claimed some of them in between; keep only ours
+        return await db.email_outbox.find({"claim": claim, "status": "sending"}, {"_id": 0}).to_list(BATCH_SIZE)
+
+    async def deliver(self, messages: list):
+        ids = [message["message_id"] for message in messages]
+        try:
+            await asyncio.to_thread(self.transport.send, messages)
+        except Exception as e:
+            logger.error(f"Failed to send {len(messages)} emails: {str(e)}")
+            await self._reschedule(messages, str(e))
+            return
+        await db.email_outbox.update_many(
+            {"message_id": {"$in": ids}},
+            {"$set": {"status": "sent", "sent_at": datetime.now(timezone.utc)}, "$unset": {"claim": ""}}
+        )
+        logger.info(f"Sent {len(messages)} emails")
+
+    async def _reschedule(self, messages: list, error: str):
+        now = datetime.now(timezone.utc)
+        updates = []
+        for message in messages:
+            attempts = message.get("attempts", 0) + 1
+            failed = attempts >= MAX_ATTEMPTS
+            updates.append(UpdateOne(
+                {"message_id": message["message_id"]},
+                {"$set": {
+                    "status": "failed" if failed else "pending",
+                    "attempts": attempts,
+                    "last_error": error,
+                    "next_attempt_at": now + backoff(attempts)
+                }, "$unset": {"claim": ""}}
+            ))
+            if failed:
+                logger.error(f"Giving up on email {message['message_id']} to {message['to']} after {attempts} attempts")
+        await db.email_outbox.bulk_write(updates, ordered=False)
+
+    async def run_once(self) -> int:
+        messages = await self.claim_batch()
+        if messages:
+            await self.deliver(messages)
+        return len(messages)
+
+    async def _run(self):
+        while True:
+            # Cleared before claiming, so mail enqueued during a send is picked up straight after
+            self._wake.clear()
+            try:
+                sent = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Email outbox worker error: {str(e)}")
+                sent = 0
+            if sent < BATCH_SIZE:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+
+    def start(self):
+        if self.transport is None:
+            self.transport = TRANSPORTS[EMAIL_TRANSPORT]()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+email_outbox = EmailOutbox()
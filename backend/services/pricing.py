@@ -0,0 +1,81 @@
+import numpy as np
+from cachetools import LRUCache
+from fastapi import HTTPException
+
+from services.inventory_calendar import inventory_calendar, parse_date, format_date, RoomCalendar
+from services.promo import find_promo
+from services.promo_rules import make_stay, promo_discount
+
+DEFAULT_BASE_PRICE = 500000
+# Longest stay /availability and /quote will price
+MAX_STAY_NIGHTS = 180
+
+# Nightly breakdowns keyed by calendar version, so any inventory write makes old entries unreachable
+_breakdown_cache = LRUCache(maxsize=4096)
+
+
+def stay_breakdown(room: dict, calendar: RoomCalendar, start: int, end: int) -> dict:
+    """
+    Price every night of [start, end) for one room type.
+
+    Nights without inventory use the room's base_price. `starting_rate` keeps
+    the /availability rule: the lower of base_price and any explicit rate.
+    """
+    base_price = room.get("base_price", DEFAULT_BASE_PRICE)
+    key = (room["room_type_id"], base_price, start, end, calendar.version)
+    breakdown = _breakdown_cache.get(key)
+    if breakdown is not None:
+        return breakdown
+
+    rates = calendar.nightly_rates(start, end, base_price)
+    explicit_rate = calendar.min_rate(start, end)
+    breakdown = {
+        "nightly_rates": [
+            {"date": format_date(start + i), "rate": float(rate)}
+            for i, rate in enumerate(rates)
+        ],
+        "subtotal": float(np.sum(rates)),
+        "starting_rate": base_price if explicit_rate is None else min(base_price, explicit_rate),
+        "unavailable_dates": calendar.blocked_dates(start, end)
+    }
+    _breakdown_cache[key] = breakdown
+    return breakdown
+
+
+async def quote_stay(room: dict, check_in: str, check_out: str, promo_code: str = "") -> dict:
+    """Per-night prices, subtotal, promo discount and total for one stay."""
+    start, end = parse_date(check_in), parse_date(check_out)
+    nights = end - start
+    if nights <= 0:
+        raise HTTPException(status_code=400, detail="Invalid dates")
+    if nights > MAX_STAY_NIGHTS:
+        raise HTTPException(status_code=400, detail=f"Stay cannot exceed {MAX_STAY_NIGHTS} nights")
+
+    calendar = await inventory_calendar.get(room["room_type_id"], start, end)
+    breakdown = stay_breakdown(room, calendar, start, end)
+    subtotal = breakdown["subtotal"]
+
+    promo = None
+    discount = 0
+    if promo_code:
+        promo = await find_promo(promo_code)
+        if promo:
+            discount = promo_discount(promo, make_stay(room["room_type_id"], start, end), subtotal)
+            if discount is None:
+                promo, discount = None, 0
+
+    return {
+        "room_type_id": room["room_type_id"],
+        "check_in": check_in,
+        "check_out": check_out,
+        "nights": nights,
+        "nightly_rates": breakdown["nightly_rates"],
+        "is_available": not breakdown["unavailable_dates"],
+        "unavailable_dates": breakdown["unavailable_dates"],
+        "subtotal": subtotal,
+        "rate_per_night": subtotal / nights,
+        "promo_code": promo["code"] if promo else "",
+        "promo_id": promo["promo_id"] if promo else None,
+        "discount_amount": discount,
+        "total_amount": subtotal - discount
+    }
@@ -0,0 +1,126 @@
+import secrets
+import uuid
+from datetime import datetime, timezone
+
+from cachetools import TTLCache
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+
+from database import db
+
+# Short enough that edits from other workers show up quickly; usage counts
+# in the cache may lag, but redemption re-checks them atomically in Mongo
+PROMO_CACHE_SECONDS = 30
+_MISSING = object()
+_promo_cache = TTLCache(maxsize=10000, ttl=PROMO_CACHE_SECONDS)
+
+
+async def find_promo(code: str):
+    """Active promo for `code`, or None. Cache hits (including misses) cost no round trip."""
+    code = code.upper()
+    promo = _promo_cache.get(code)
+    if promo is None:
+        promo = await db.promo_codes.find_one({"code": code, "is_active": True}, {"_id": 0}) or _MISSING
+        _promo_cache[code] = promo
+    return None if promo is _MISSING else promo
+
+
+def invalidate_promos(code: str = None):
+    if code is None:
+        _promo_cache.clear()
+    else:
+        _promo_cache.pop(code.upper(), None)
+
+
+async def redeem_promo(promo_id: str, code: str) -> dict:
+    """
+    Consume one use of a promo, or raise 409 if it ran out in the meantime.
+
+    The usage check and the increment are a single conditional update, so
+    concurrent bookings can never push current_usage past max_usage.
+    """
+    promo = await db.promo_codes.find_one_and_update(
+        {"promo_id": promo_id, "is_active": True, "$expr": {"$lt": ["$current_usage", "$max_usage"]}},
+        {"$inc": {"current_usage": 1}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE
+    )
+    if promo is None:
+        invalidate_promos(code)
+        raise HTTPException(status_code=409, detail="Promo code is no longer available")
+    promo["current_usage"] += 1
+    _promo_cache[promo["code"]] = promo
+    return promo
+
+
+async def release_promo(promo_id: str, code: str):
+    """Give back a use taken by redeem_promo when the booking could not be stored."""
+    await db.promo_codes.update_one(
+        {"promo_id": promo_id, "current_usage": {"$gt": 0}},
+        {"$inc": {"current_usage": -1}}
+    )
+    invalidate_promos(code)
+
+
+# Bulk generation: look-alike characters (0/O, 1/I) are left out
+CODE_CHARSETS = {"#": "23456789", "?": "ABCDEFGHJKLMNPQRSTUVWXYZ", "*": "23456789ABCDEFGHJKLMNPQRSTUVWXYZ"}
+MAX_BULK_CODES = 100000
+BULK_INSERT_CHUNK = 1000
+MAX_COLLISION_ROUNDS = 5
+# The pattern must allow this many times more codes than requested, keeping collisions rare
+MIN_CODE_SPACE_FACTOR = 100
+
+
+def code_space(pattern: str) -> int:
+    space = 1
+    for char in pattern:
+        space *= len(CODE_CHARSETS.get(char, "x"))
+    return space
+
+
+def random_code(pattern: str) -> str:
+    return "".join(secrets.choice(CODE_CHARSETS[char]) if char in CODE_CHARSETS else char for char in pattern.upper())
+
+
+async def create_codes_in_bulk(template: dict, pattern: str, count: int) -> str:
+    """
+    Insert `count` promo codes generated from `pattern`, all sharing `template`.
+
+    Codes go in with unordered insert_many against the unique code index;
+    only the codes rejected as duplicates are regenerated and retried.
+    Returns the batch_id stamped on every generated code.
+    """
+    if not 0 < count <= MAX_BULK_CODES:
+        raise HTTPException(status_code=400, detail=f"count must be between 1 and {MAX_BULK_CODES}")
+    if code_space(pattern) < count * MIN_CODE_SPACE_FACTOR:
+        raise HTTPException(status_code=400, detail="Pattern has too few random characters for this many codes")
+
+    batch_id = str(uuid.uuid4())
+    created_at = datetime.now(timezone.utc).isoformat()
+
+    def new_docs(n: int) -> list:
+        return [
+            {**template, "promo_id": str(uuid.uuid4()), "code": random_code(pattern), "batch_id": batch_id, "created_at": created_at}
+            for _ in range(n)
+        ]
+
+    remaining = count
+    for _ in range(MAX_COLLISION_ROUNDS):
+        collisions = 0
+        while remaining:
+            chunk = new_docs(min(remaining, BULK_INSERT_CHUNK))
+            remaining -= len(chunk)
+            try:
+                await db.promo_codes.insert_many(chunk, ordered=False)
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                if any(error.get("code") != 11000 for error in errors):
+                    raise
+                collisions += len(errors)
+        if not collisions:
+            return batch_id
+        remaining = collisions
+
+    await db.promo_codes.delete_many({"batch_id": batch_id})
+    raise HTTPException(status_code=409, detail="Could not generate enough unique codes, try a longer pattern")
@@ -0,0 +1,160 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from cachetools import LRUCache
+from fastapi import HTTPException
+
+from services.inventory_calendar import parse_date
+
+CONDITION_FIELDS = (
+    "min_nights", "max_nights", "stay_from", "stay_until",
+    "weekdays", "early_bird_days", "last_minute_days"
+)
+ALL_WEEKDAYS = 0b1111111
+
+# Compiled promos keyed by (promo_id, updated_at), so an edit compiles a fresh entry
+_compiled_cache = LRUCache(maxsize=10000)
+
+
+@dataclass(frozen=True)
+class Stay:
+    """What the rules look at, worked out once per quote."""
+    room_type_id: str
+    start: int
+    nights: int
+    # Bit n set when the stay includes a night on weekday n (0 = Monday)
+    weekday_mask: int
+    # Days between booking and check-in
+    lead_days: int
+    booked_at: str
+
+
+def make_stay(room_type_id: str, start: int, end: int, now: datetime = None) -> Stay:
+    now = now or datetime.now(timezone.utc)
+    nights = end - start
+    if nights >= 7:
+        mask = ALL_WEEKDAYS
+    else:
+        mask = 0
+        for day in range(start, end):
+            # Ordinal 1 (0001-01-01) is a Monday
+            mask |= 1 << ((day - 1) % 7)
+    return Stay(room_type_id, start, nights, mask, start - now.date().toordinal(), now.isoformat())
+
+
+def _compile_conditions(spec: dict) -> tuple:
+    """Turn the condition fields of a promo or rule into a tuple of predicates, skipping unset ones."""
+    checks = []
+    if spec.get("min_nights") is not None:
+        min_nights = spec["min_nights"]
+        checks.append(lambda stay: stay.nights >= min_nights)
+    if spec.get("max_nights") is not None:
+        max_nights = spec["max_nights"]
+        checks.append(lambda stay: stay.nights <= max_nights)
+    if spec.get("stay_from"):
+        first = parse_date(spec["stay_from"])
+        checks.append(lambda stay: stay.start >= first)
+    if spec.get("stay_until"):
+        # Inclusive last night of the window
+        last = parse_date(spec["stay_until"])
+        checks.append(lambda stay: stay.start + stay.nights - 1 <= last)
+    if spec.get("weekdays") is not None:
+        if not all(0 <= day < 7 for day in spec["weekdays"]):
+            raise HTTPException(status_code=400, detail="weekdays must be between 0 (Monday) and 6 (Sunday)")
+        allowed = sum(1 << day for day in set(spec["weekdays"]))
+        checks.append(lambda stay: not stay.weekday_mask & ~allowed)
+    if spec.get("early_bird_days") is not None:
+        early = spec["early_bird_days"]
+        checks.append(lambda stay: stay.lead_days >= early)
+    if spec.get("last_minute_days") is not None:
+        late = spec["last_minute_days"]
+        checks.append(lambda stay: 0 <= stay.lead_days <= late)
+    return tuple(checks)
+
+
+class CompiledRule:
+    __slots__ = ("discount_type", "discount_value", "priority", "stackable", "checks")
+
+    def __init__(self, spec: dict):
+        self.discount_type = spec["discount_type"]
+        self.discount_value = spec["discount_value"]
+        self.priority = spec.get("priority", 0)
+        self.stackable = spec.get("stackable", False)
+        self.checks = _compile_conditions(spec)
+
+    def matches(self, stay: Stay) -> bool:
+        return all(check(stay) for check in self.checks)
+
+    def discount(self, amount: float) -> float:
+        if self.discount_type == "percent":
+            return amount * (self.discount_value / 100)
+        return self.discount_value
+
+
+class CompiledPromo:
+    """
+    A promo code with its conditions and discount tiers reduced to predicates.
+
+    Tiers are tried highest priority first. The first match applies; further
+    matches are added on top only while both it and they are stackable.
+    """
+    __slots__ = ("valid_from", "valid_until", "room_type_ids", "checks", "rules")
+
+    def __init__(self, promo: dict):
+        self.valid_from = promo["valid_from"]
+        self.valid_until = promo["valid_until"]
+        self.room_type_ids = frozenset(promo.get("room_type_ids") or ())
+        self.checks = _compile_conditions(promo)
+        # Without tiers the promo's own discount is the single, unconditional tier
+        rules = promo.get("rules") or [{"discount_type": promo["discount_type"], "discount_value": promo["discount_value"]}]
+        self.rules = tuple(sorted(
+            (CompiledRule(rule) for rule in rules),
+            key=lambda rule: rule.priority,
+            reverse=True
+        ))
+
+    def applies(self, stay: Stay) -> bool:
+        if not self.valid_from <= stay.booked_at <= self.valid_until:
+            return False
+        if self.room_type_ids and stay.room_type_id not in self.room_type_ids:
+            return False
+        return all(check(stay) for check in self.checks)
+
+    def discount(self, stay: Stay, subtotal: float) -> float:
+        """Total discount for the stay, or None when no tier matches."""
+        remaining = subtotal
+        applied = None
+        for rule in self.rules:
+            if applied is not None and not applied.stackable:
+                break
+            if applied is not None and not rule.stackable:
+                continue
+            if not rule.matches(stay):
+                continue
+            remaining -= min(rule.discount(remaining), remaining)
+            if applied is None:
+                applied = rule
+        return None if applied is None else subtotal - remaining
+
+
+def compile_promo(promo: dict) -> CompiledPromo:
+    key = (promo["promo_id"], promo.get("updated_at"))
+    compiled = _compiled_cache.get(key)
+    if compiled is None:
+        compiled = _compiled_cache[key] = CompiledPromo(promo)
+    return compiled
+
+
+def promo_discount(promo: dict, stay: Stay, subtotal: float) -> float:
+    """Discount `promo` gives on this stay, or None when it does not apply."""
+    if promo["current_usage"] >= promo["max_usage"]:
+        return None
+    compiled = compile_promo(promo)
+    if not compiled.applies(stay):
+        return None
+    return compiled.discount(stay, subtotal)
+
+
+def check_promo_rules(promo: dict):
+    """Compile a promo being saved so bad dates or weekdays are a 400 now rather than at booking time."""
+    CompiledPromo(promo)
@@ -0,0 +1,30 @@
+import time
+
+from cachetools import TTLCache
+from fastapi import HTTPException, Request
+
+
+class RateLimiter:
+    """
+    Fixed-window request limit per client IP, counted in this process.
+
+    Each worker keeps its own counts, so the effective limit across a
+    deployment is `limit` times the number of workers.
+    """
+
+    def __init__(self, limit: int, window_seconds: int, maxsize: int = 10000):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self._counts = TTLCache(maxsize=maxsize, ttl=window_seconds)
+
+    def check(self, request: Request):
+        window = int(time.monotonic() // self.window_seconds)
+        key = (request.client.host if request.client else None, window)
+        count = self._counts.get(key, 0) + 1
+        self._counts[key] = count
+        if count > self.limit:
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests, try again later",
+                headers={"Retry-After": str(self.window_seconds)}
+            )
@@ -0,0 +1,126 @@
+from datetime import date
+
+import numpy as np
+from cachetools import TTLCache
+from fastapi import HTTPException
+
+from database import db
+from services.inventory_calendar import inventory_calendar, parse_date, format_date
+
+GRANULARITIES = ("day", "week", "month")
+MAX_REPORT_DAYS = 3 * 366
+REPORT_CACHE_SECONDS = 60
+
+_STAT_COLUMNS = ("rooms_sold", "revenue", "cancellations", "pickup", "pickup_revenue")
+_report_cache = TTLCache(maxsize=64, ttl=REPORT_CACHE_SECONDS)
+
+
+def clear_report_cache():
+    _report_cache.clear()
+
+
+def _period_label(ordinal: int, granularity: str) -> str:
+    day = date.fromordinal(ordinal)
+    if granularity == "week":
+        return format_date(ordinal - day.weekday())
+    if granularity == "month":
+        return day.strftime("%Y-%m")
+    return day.isoformat()
+
+
+def _series(periods: list, buckets: np.ndarray, columns: dict) -> list:
+    """Sum daily columns into periods and derive occupancy, ADR and RevPAR."""
+    totals = {name: np.bincount(buckets, weights=values, minlength=len(periods)) for name, values in columns.items()}
+    available, sold, revenue = totals["rooms_available"], totals["rooms_sold"], totals["revenue"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        occupancy = np.where(available > 0, sold / available, 0.0)
+        adr = np.where(sold > 0, revenue / sold, 0.0)
+        revpar = np.where(available > 0, revenue / available, 0.0)
+
+    return [
+        {
+            "period": period,
+            "rooms_available": int(available[i]),
+            "rooms_sold": int(sold[i]),
+            "occupancy": round(float(occupancy[i]), 4),
+            "revenue": round(float(revenue[i]), 2),
+            "adr": round(float(adr[i]), 2),
+            "revpar": round(float(revpar[i]), 2),
+            "cancellations": int(totals["cancellations"][i]),
+            "pickup": int(totals["pickup"][i]),
+            "pickup_revenue": round(float(totals["pickup_revenue"][i]), 2)
+        }
+        for i, period in enumerate(periods)
+    ]
+
+
+async def performance_report(start_date: str, end_date: str, granularity: str = "day", room_type_id: str = None) -> dict:
+    """
+    Occupancy, ADR, RevPAR and booking pace per room type for [start_date, end_date].
+
+    Sold nights and revenue come from daily_stats; rooms available is the
+    remaining allotment plus the nights already sold, taken from the inventory
+    calendar; closed nights and nights without inventory count only what was sold.
+    Pickup is bookings made during the period, regardless of stay date.
+    """
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of {', '.join(GRANULARITIES)}")
+    start, end = parse_date(start_date), parse_date(end_date) + 1
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    if end - start > MAX_REPORT_DAYS:
+        raise HTTPException(status_code=400, detail=f"Report range is limited to {MAX_REPORT_DAYS} days")
+
+    cache_key = (start, end, granularity, room_type_id)
+    report = _report_cache.get(cache_key)
+    if report is not None:
+        return report
+
+    labels = [_period_label(ordinal, granularity) for ordinal in range(start, end)]
+    periods, buckets = np.unique(labels, return_inverse=True)
+    periods = [str(period) for period in periods]
+
+    stats_query = {"date": {"$gte": start_date, "$lte": end_date}}
+    room_query = {"is_active": True}
+    if room_type_id:
+        stats_query["room_type_id"] = room_type_id
+        room_query = {"room_type_id": room_type_id}
+
+    days = end - start
+    columns_by_room = {}
+    async for doc in db.daily_stats.find(stats_query, {"_id": 0, "updated_at": 0}):
+        columns = columns_by_room.setdefault(doc["room_type_id"], {name: np.zeros(days) for name in _STAT_COLUMNS})
+        i = parse_date(doc["date"]) - start
+        for name in _STAT_COLUMNS:
+            columns[name][i] = doc.get(name, 0)
+
+    # Active room types plus any room type with history in the range
+    rooms = await db.room_types.find(
+        {"$or": [room_query, {"room_type_id": {"$in": list(columns_by_room)}}]},
+        {"_id": 0, "room_type_id": 1, "name": 1}
+    ).to_list(None)
+    calendars = await inventory_calendar.get_many([room["room_type_id"] for room in rooms], start, end)
+
+    total_columns = {name: np.zeros(days) for name in _STAT_COLUMNS + ("rooms_available",)}
+    room_reports = []
+    for room in rooms:
+        columns = columns_by_room.get(room["room_type_id"]) or {name: np.zeros(days) for name in _STAT_COLUMNS}
+        present, allotment, _, closed = calendars[room["room_type_id"]].window(start, end)
+        columns["rooms_available"] = np.where(present & ~closed, allotment + columns["rooms_sold"], columns["rooms_sold"])
+        for name, values in columns.items():
+            total_columns[name] += values
+        room_reports.append({
+            "room_type_id": room["room_type_id"],
+            "name": room["name"],
+            "series": _series(periods, buckets, columns)
+        })
+
+    report = {
+        "start_date": start_date,
+        "end_date": end_date,
+        "granularity": granularity,
+        "room_types": room_reports,
+        "total": _series(periods, buckets, total_columns)
+    }
+    _report_cache[cache_key] = report
+    return report
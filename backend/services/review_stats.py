@@ -0,0 +1,115 @@
+from pymongo import UpdateOne
+
+from database import db
+from services.rollups import Rollup, new_deltas, run_rebuild
+
+# One review_stats document per scope: the whole hotel, or one room_type_id.
+#   count / rating_sum / histogram.1-5 - visible reviews only
+#   pending                            - reviews waiting for moderation
+HOTEL_SCOPE = "hotel"
+RATINGS = (1, 2, 3, 4, 5)
+REVIEW_STATS_PROJECTION = {"_id": 0, "rating": 1, "is_visible": 1, "room_type_id": 1, "reservation_id": 1}
+
+
+def _scopes(review: dict) -> list:
+    return [HOTEL_SCOPE, review["room_type_id"]] if review.get("room_type_id") else [HOTEL_SCOPE]
+
+
+def _add_review(deltas: dict, review: dict, visible: bool, sign: int):
+    for scope in _scopes(review):
+        if visible:
+            deltas[scope]["count"] += sign
+            deltas[scope]["rating_sum"] += sign * review["rating"]
+            deltas[scope][f"histogram.{review['rating']}"] += sign
+        else:
+            deltas[scope]["pending"] += sign
+
+
+_rollup = Rollup("review_stats", ("scope",))
+
+
+async def review_room_type_id(reservation_id: str) -> str:
+    """Room type a review is about, taken from the reservation it references."""
+    if not reservation_id:
+        return ""
+    reservation = await db.reservations.find_one({"reservation_id": reservation_id}, {"_id": 0, "room_type_id": 1})
+    return reservation["room_type_id"] if reservation else ""
+
+
+async def record_review_created(review: dict):
+    deltas = new_deltas()
+    _add_review(deltas, review, review.get("is_visible", False), 1)
+    await _rollup.apply(deltas)
+
+
+async def record_visibility_change(review: dict, was_visible: bool, is_visible: bool):
+    if was_visible == is_visible:
+        return
+    deltas = new_deltas()
+    _add_review(deltas, review, was_visible, -1)
+    _add_review(deltas, review, is_visible, 1)
+    await _rollup.apply(deltas)
+
+
+async def record_bulk_visibility_change(reviews: list, is_visible: bool):
+    """Stats for a bulk moderation; `reviews` are the ones whose visibility actually flipped."""
+    deltas = new_deltas()
+    for review in reviews:
+        _add_review(deltas, review, not is_visible, -1)
+        _add_review(deltas, review, is_visible, 1)
+    await _rollup.apply(deltas)
+
+
+def summarize(doc: dict) -> dict:
+    """Public shape of a review_stats document, with the mean worked out."""
+    doc = doc or {}
+    count = doc.get("count", 0)
+    histogram = doc.get("histogram", {})
+    return {
+        "count": count,
+        "mean": round(doc.get("rating_sum", 0) / count, 2) if count else None,
+        "histogram": {str(rating): histogram.get(str(rating), 0) for rating in RATINGS},
+        "pending": doc.get("pending", 0)
+    }
+
+
+async def _scan_reviews(since: str) -> dict:
+    reviews = await db.reviews.find({"created_at": {"$lt": since}}, {**REVIEW_STATS_PROJECTION, "review_id": 1}).to_list(None)
+
+    missing = {r["reservation_id"] for r in reviews if r.get("reservation_id") and "room_type_id" not in r}
+    room_types = {}
+    if missing:
+        async for reservation in db.reservations.find(
+            {"reservation_id": {"$in": list(missing)}}, {"_id": 0, "reservation_id": 1, "room_type_id": 1}
+        ):
+            room_types[reservation["reservation_id"]] = reservation["room_type_id"]
+        backfill = []
+        for review in reviews:
+            if "room_type_id" not in review:
+                review["room_type_id"] = room_types.get(review.get("reservation_id"), "")
+                backfill.append(UpdateOne({"review_id": review["review_id"]}, {"$set": {"room_type_id": review["room_type_id"]}}))
+        if backfill:
+            await db.reviews.bulk_write(backfill, ordered=False)
+
+    deltas = new_deltas()
+    for review in reviews:
+        _add_review(deltas, review, review.get("is_visible", False), 1)
+    return deltas
+
+
+async def rebuild_review_stats():
+    """
+    Recompute review_stats from every review, filling in room_type_id on
+    reviews stored before it was recorded. None if another process is already at it.
+    """
+    return await _rollup.rebuild(_scan_reviews)
+
+
+async def ensure_review_stats():
+    """Backfill review_stats on first start after it was introduced."""
+    await _rollup.ensure("reviews", _scan_reviews)
+
+
+if __name__ == "__main__":
+    # python -m services.review_stats  (run from the backend directory)
+    run_rebuild(rebuild_review_stats)
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone, timedelta
+
+from cachetools import TTLCache
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from database import db, INDEXES
+
+logger = logging.getLogger(__name__)
+
+REBUILD_BATCH_SIZE = 1000
+# Longest a rebuild may hold the lock before another process may take over
+REBUILD_LOCK_TTL = timedelta(hours=1)
+# How long each process trusts its last look at rebuild_locks
+LOCK_CHECK_SECONDS = 5
+
+_locks = TTLCache(maxsize=16, ttl=LOCK_CHECK_SECONDS)
+
+
+def new_deltas() -> dict:
+    """Counter changes keyed like the rollup's documents: {key: {field: delta}}."""
+    return defaultdict(lambda: defaultdict(int))
+
+
+class Rollup:
+    """
+    A summary collection kept current with $inc deltas, one document per key.
+
+    Keys are tuples of `key_fields` values, or the bare value when there is
+    a single key field. Dotted field names ("histogram.5") build nested counters.
+    """
+
+    def __init__(self, collection: str, key_fields: tuple):
+        self.collection = collection
+        self.key_fields = key_fields
+
+    def _upserts(self, deltas: dict, now: str) -> list:
+        operations = []
+        for key, fields in deltas.items():
+            values = key if len(self.key_fields) > 1 else (key,)
+            operations.append(UpdateOne(
+                dict(zip(self.key_fields, values)),
+                {"$inc": dict(fields), "$set": {"updated_at": now}},
+                upsert=True
+            ))
+        return operations
+
+    async def _rebuild_lock(self):
+        if self.collection not in _locks:
+            _locks[self.collection] = await db.rebuild_locks.find_one(
+                {"name": self.collection}, {"_id": 0, "scratch": 1, "since": 1}
+            )
+        return _locks[self.collection]
+
+    async def apply(self, deltas: dict):
+        if not deltas:
+            return
+        now = datetime.now(timezone.utc)
+        operations = self._upserts(deltas, now.isoformat())
+        await db[self.collection].bulk_write(operations, ordered=False)
+        # Changes from `since` on are left out of the rebuild's scan, so they go to its scratch table too
+        lock = await self._rebuild_lock()
+        if lock is not None and now.isoformat() >= lock["since"]:
+            await db[lock["scratch"]].bulk_write(operations, ordered=False)
+
+    async def rebuild(self, scan):
+        """
+        Replace the collection with the deltas returned by `await scan(since)`.
+
+        `scan` counts only source documents created before `since`. The lock
+        document publishes the run's scratch collection and `since`, set far
+        enough ahead that every process has seen the lock by then; apply()
+        mirrors every change made from `since` on into the scratch table,
+        and the scan totals are added to it with $inc before the rename.
+        Updates to documents created before `since` that land while the scan
+        runs (a cancellation, a review being approved) can be counted twice;
+        run the rebuild again once things are quiet if that matters.
+
+        A second process asking to rebuild meanwhile gets None; otherwise the
+        number of documents written is returned.
+        """
+        now = datetime.now(timezone.utc)
+        run_id = uuid.uuid4().hex
+        since = now + timedelta(seconds=LOCK_CHECK_SECONDS)
+        scratch = db[f"{self.collection}_rebuild_{run_id}"]
+        # Mirrored upserts rely on the unique key index, so it exists before the lock is visible
+        await scratch.create_indexes(INDEXES[self.collection])
+        try:
+            await db.rebuild_locks.insert_one({
+                "name": self.collection, "run_id": run_id, "scratch": scratch.name,
+                "since": since.isoformat(), "expires_at": now + REBUILD_LOCK_TTL
+            })
+        except DuplicateKeyError:
+            await scratch.drop()
+            logger.info(f"{self.collection} is already being rebuilt by another process")
+            return None
+
+        try:
+            await asyncio.sleep((since - datetime.now(timezone.utc)).total_seconds())
+            deltas = await scan(since.isoformat())
+            operations = self._upserts(deltas, now.isoformat())
+            for i in range(0, len(operations), REBUILD_BATCH_SIZE):
+                await scratch.bulk_write(operations[i:i + REBUILD_BATCH_SIZE], ordered=False)
+            await scratch.rename(self.collection, dropTarget=True)
+        finally:
+            await db.rebuild_locks.delete_one({"run_id": run_id})
+            _locks.pop(self.collection, None)
+            # Other processes may mirror into the scratch name until their view of the lock expires
+            await asyncio.sleep(LOCK_CHECK_SECONDS)
+            await scratch.drop()
+
+        logger.info(f"Rebuilt {self.collection} with {len(deltas)} documents")
+        return len(deltas)
+
+    async def ensure(self, source: str, scan):
+        """Backfill on first start after the rollup was introduced."""
+        if await db[self.collection].estimated_document_count() == 0 and await db[source].estimated_document_count() > 0:
+            await self.rebuild(scan)
+
+
+def run_rebuild(rebuild):
+    """Entry point for the `python -m services.<module>` rebuild commands."""
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(rebuild())
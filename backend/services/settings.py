@@ -0,0 +1,48 @@
+import time
+
+from database import db
+
+# Other workers pick up content edits after at most this long
+SETTINGS_TTL_SECONDS = 300
+
+DEFAULT_SETTINGS = {
+    "whatsapp": "6281130700206",
+    "address": "Jl. Raya Punten No.86, Punten, Kec. Bumiaji, Kota Batu, Jawa Timur 65338 Indonesia",
+    "phone": "",
+    "email": ""
+}
+
+_settings = None
+_loaded_at = 0.0
+
+
+async def get_hotel_settings() -> dict:
+    """
+    Hotel contact details from the global site_content sections.
+    Loaded once and kept in memory until the content changes or the TTL passes.
+    """
+    global _settings, _loaded_at
+    if _settings is not None and time.monotonic() - _loaded_at < SETTINGS_TTL_SECONDS:
+        return _settings
+
+    settings = dict(DEFAULT_SETTINGS)
+    docs = await db.site_content.find(
+        {"page": "global", "section": {"$in": ["footer", "contact"]}},
+        {"_id": 0, "section": 1, "content": 1}
+    ).to_list(None)
+    # The dedicated WhatsApp section wins over the number repeated in the footer
+    for doc in sorted(docs, key=lambda d: d["section"] == "contact"):
+        content = doc.get("content") or {}
+        for key in ("address", "phone", "email", "whatsapp"):
+            if content.get(key):
+                settings[key] = content[key]
+        if doc["section"] == "contact" and content.get("number"):
+            settings["whatsapp"] = content["number"]
+
+    _settings, _loaded_at = settings, time.monotonic()
+    return settings
+
+
+def invalidate_hotel_settings():
+    global _settings
+    _settings = None
@@ -0,0 +1,83 @@
+from datetime import date, timedelta
+
+from database import db
+from services.rollups import Rollup, new_deltas, run_rebuild
+
+# Per (date, room_type_id):
+#   rooms_sold / revenue / cancellations - room nights and room revenue for guests staying that night
+#   pickup / pickup_revenue               - bookings made that day (net of later cancellations)
+STAT_FIELDS = ("rooms_sold", "revenue", "cancellations", "pickup", "pickup_revenue")
+# Reservation fields the stats are derived from
+STATS_PROJECTION = {"_id": 0, "room_type_id": 1, "check_in": 1, "check_out": 1, "total_amount": 1, "status": 1, "created_at": 1}
+
+
+def _stay_dates(reservation: dict) -> list:
+    check_in = date.fromisoformat(reservation["check_in"])
+    check_out = date.fromisoformat(reservation["check_out"])
+    return [(check_in + timedelta(days=i)).isoformat() for i in range((check_out - check_in).days)]
+
+
+def _add_booking(deltas: dict, reservation: dict, sign: int):
+    nights = _stay_dates(reservation)
+    room_type_id = reservation["room_type_id"]
+    nightly_revenue = reservation.get("total_amount", 0) / len(nights) if nights else 0
+    for night in nights:
+        deltas[(night, room_type_id)]["rooms_sold"] += sign
+        deltas[(night, room_type_id)]["revenue"] += sign * nightly_revenue
+    booked_on = reservation["created_at"][:10]
+    deltas[(booked_on, room_type_id)]["pickup"] += sign
+    deltas[(booked_on, room_type_id)]["pickup_revenue"] += sign * reservation.get("total_amount", 0)
+
+
+def _add_cancellation(deltas: dict, reservation: dict, sign: int):
+    for night in _stay_dates(reservation):
+        deltas[(night, reservation["room_type_id"])]["cancellations"] += sign
+
+
+_rollup = Rollup("daily_stats", ("date", "room_type_id"))
+
+
+async def record_reservation_created(reservation: dict):
+    deltas = new_deltas()
+    _add_booking(deltas, reservation, 1)
+    if reservation.get("status") == "cancelled":
+        _add_booking(deltas, reservation, -1)
+        _add_cancellation(deltas, reservation, 1)
+    await _rollup.apply(deltas)
+
+
+async def record_status_change(reservation: dict, old_status: str, new_status: str):
+    """Move a reservation's nights in or out of the sold figures when it is cancelled or reinstated."""
+    was_cancelled, is_cancelled = old_status == "cancelled", new_status == "cancelled"
+    if was_cancelled == is_cancelled:
+        return
+    sign = 1 if is_cancelled else -1
+    deltas = new_deltas()
+    _add_booking(deltas, reservation, -sign)
+    _add_cancellation(deltas, reservation, sign)
+    await _rollup.apply(deltas)
+
+
+async def _scan_reservations(since: str) -> dict:
+    deltas = new_deltas()
+    async for reservation in db.reservations.find({"created_at": {"$lt": since}}, STATS_PROJECTION):
+        _add_booking(deltas, reservation, 1)
+        if reservation.get("status") == "cancelled":
+            _add_booking(deltas, reservation, -1)
+            _add_cancellation(deltas, reservation, 1)
+    return deltas
+
+
+async def rebuild_daily_stats():
+    """Recompute daily_stats from the full reservation history; None if another process is already at it."""
+    return await _rollup.rebuild(_scan_reservations)
+
+
+async def ensure_daily_stats():
+    """Backfill daily_stats on first start after it was introduced."""
+    await _rollup.ensure("reservations", _scan_reservations)
+
+
+if __name__ == "__main__":
+    # python -m services.stats  (run from the backend directory)
+    run_rebuild(rebuild_daily_stats)
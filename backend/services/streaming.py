@@ -0,0 +1,98 @@
+import base64
+import json
+
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+# Serialized documents are flushed in chunks of roughly this many bytes
+STREAM_CHUNK_BYTES = 64 * 1024
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode()
+
+
+def decode_cursor(token: str, size: int) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    return values
+
+
+def keyset_filter(sort: list, values: list) -> dict:
+    """
+    Match documents strictly after `values` in `sort` order, e.g. for
+    [("created_at", -1), ("reservation_id", -1)] build
+    {"$or": [{created_at < v0}, {created_at == v0, reservation_id < v1}]}.
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {prev_field: values[j] for j, (prev_field, _) in enumerate(sort[:i])}
+        clause[field] = {"$gt" if direction > 0 else "$lt": values[i]}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+
+async def fetch_page(collection, query: dict, projection: dict, sort: list, limit: int, after: str = None) -> tuple:
+    """
+    One keyset page: an indexed range scan starting after the `after` token.
+    Returns (documents, next_cursor) where next_cursor is None on the last page.
+    """
+    limit = min(max(limit, 1), MAX_PAGE_SIZE)
+    if after:
+        query = {"$and": [query, keyset_filter(sort, decode_cursor(after, len(sort)))]}
+
+    docs = await collection.find(query, projection).sort(sort).limit(limit + 1).to_list(limit + 1)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor([docs[-1].get(field) for field, _ in sort])
+    return docs, next_cursor
+
+
+def wants_ndjson(request: Request, output_format: str = None) -> bool:
+    if output_format:
+        return output_format == "ndjson"
+    return "application/x-ndjson" in request.headers.get("accept", "")
+
+
+async def _iterate(documents):
+    if hasattr(documents, "__aiter__"):
+        async for doc in documents:
+            yield doc
+    else:
+        for doc in documents:
+            yield doc
+
+
+async def _encode(documents, ndjson: bool):
+    buffer = bytearray() if ndjson else bytearray(b"[")
+    first = True
+    async for doc in _iterate(documents):
+        if ndjson:
+            buffer += json.dumps(doc, default=str).encode() + b"\n"
+        else:
+            if not first:
+                buffer += b","
+            buffer += json.dumps(doc, default=str).encode()
+        first = False
+        if len(buffer) >= STREAM_CHUNK_BYTES:
+            yield bytes(buffer)
+            buffer.clear()
+    if not ndjson:
+        buffer += b"]"
+    if buffer:
+        yield bytes(buffer)
+
+
+def stream_documents(documents, ndjson: bool = False, headers: dict = None) -> StreamingResponse:
+    """
+    Stream a Motor cursor (or any iterable of documents) as a JSON array or
+    NDJSON without holding the full result in memory.
+    """
+    media_type = "application/x-ndjson" if ndjson else "application/json"
+    return StreamingResponse(_encode(documents, ndjson), media_type=media_type, headers=headers)
@@ -0,0 +1,128 @@
+import os
+import tempfile
+from dataclasses import dataclass
+
+from fastapi import HTTPException, Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+# Room for the boundaries and part headers around the file in a multipart body
+MULTIPART_OVERHEAD = 64 * 1024
+FILE_FIELD = b"file"
+
+
+@dataclass
+class SpooledUpload:
+    path: str
+    filename: str
+    content_type: str
+    size: int
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class _FilePartParser:
+    """
+    Multipart callbacks that write the `file` field straight to a temp file,
+    checking its type from the part headers and its size as bytes arrive.
+    """
+
+    def __init__(self, validate, max_size: int):
+        self.validate = validate
+        self.max_size = max_size
+        self.spool = tempfile.NamedTemporaryFile(prefix="upload-", delete=False)
+        self.headers = {}
+        self.header_field = b""
+        self.header_value = b""
+        self.in_file = False
+        self.found = False
+        self.filename = ""
+        self.content_type = ""
+        self.size = 0
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end
+        }
+
+    def on_part_begin(self):
+        self.headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self.header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self.header_value += data[start:end]
+
+    def on_header_end(self):
+        self.headers[self.header_field.lower()] = self.header_value
+        self.header_field, self.header_value = b"", b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self.headers.get(b"content-disposition", b""))
+        if options.get(b"name") != FILE_FIELD or self.found:
+            return
+        self.in_file = True
+        self.filename = options.get(b"filename", b"").decode("utf-8", "replace")
+        self.content_type = self.headers.get(b"content-type", b"").decode("latin-1").strip()
+        # Wrong types are turned away before a single byte of the file is stored
+        is_valid, error = self.validate(self.content_type, 0)
+        if not is_valid:
+            raise HTTPException(status_code=400, detail=error)
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if not self.in_file:
+            return
+        self.size += end - start
+        if self.size > self.max_size:
+            raise HTTPException(status_code=413, detail=self.validate(self.content_type, self.size)[1])
+        self.spool.write(data[start:end])
+
+    def on_part_end(self):
+        if self.in_file:
+            self.in_file = False
+            self.found = True
+
+
+async def receive_upload(request: Request, validate, max_size: int) -> SpooledUpload:
+    """
+    Stream the `file` field of a multipart request to a temporary file.
+
+    The body is parsed as it arrives, so memory stays at one network chunk
+    and an oversized upload is rejected as soon as it crosses `max_size`.
+    `validate(content_type, size)` returns (is_valid, error) like the
+    cloudinary_helper validators. The caller removes the file when done.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > max_size + MULTIPART_OVERHEAD:
+        raise HTTPException(status_code=413, detail="Upload exceeds the size limit")
+
+    part = _FilePartParser(validate, max_size)
+    try:
+        parser = MultipartParser(options[b"boundary"], part.callbacks())
+        async for chunk in request.stream():
+            parser.write(chunk)
+        parser.finalize()
+    except BaseException:
+        part.spool.close()
+        os.remove(part.spool.name)
+        raise
+    part.spool.close()
+
+    upload = SpooledUpload(part.spool.name, part.filename, part.content_type, part.size)
+    if not part.found:
+        upload.remove()
+        raise HTTPException(status_code=400, detail="No file uploaded")
+    return upload
@@ -0,0 +1,279 @@
+"""
+Spencer Green Hotel - Availability Engine Tests
+Tests for the single-pass availability search and its latency profile
+Endpoints: /api/availability, /api/admin/inventory/bulk-update
+"""
+import pytest
+import requests
+import os
+import time
+import statistics
+from datetime import datetime, timedelta
+import uuid
+
+# Get BASE_URL from environment
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+# Test credentials
+ADMIN_EMAIL = "admin@spencergreenhotel.com"
+ADMIN_PASSWORD = "admin123"
+
+# Room type counts the benchmark grows through
+BENCHMARK_SIZES = [3, 50, 200]
+BENCHMARK_SAMPLES = 15
+
+
+@pytest.fixture(scope="module")
+def auth_headers():
+    """Get headers with admin auth token"""
+    response = requests.post(f"{BASE_URL}/api/auth/login", json={
+        "email": ADMIN_EMAIL,
+        "password": ADMIN_PASSWORD
+    })
+    if response.status_code != 200:
+        pytest.skip("Authentication failed - cannot run availability tests")
+    return {
+        "Authorization": f"Bearer {response.json()['token']}",
+        "Content-Type": "application/json"
+    }
+
+
+def create_test_room(auth_headers, base_price=1000000):
+    response = requests.post(f"{BASE_URL}/api/admin/rooms", json={
+        "name": f"TEST_Avail_{uuid.uuid4().hex[:8]}",
+        "description": "Room created by availability engine tests",
+        "base_price": base_price,
+        "max_guests": 2
+    }, headers=auth_headers)
+    assert response.status_code == 200, f"Create room failed: {response.text}"
+    return response.json()["room_type_id"]
+
+
+def delete_test_rooms(auth_headers, room_ids):
+    for room_id in room_ids:
+        requests.delete(f"{BASE_URL}/api/admin/rooms/{room_id}", headers=auth_headers)
+
+
+def stay_dates(offset_days, nights):
+    check_in = datetime.now() + timedelta(days=offset_days)
+    check_out = check_in + timedelta(days=nights)
+    return check_in.strftime("%Y-%m-%d"), check_out.strftime("%Y-%m-%d")
+
+
+class TestAvailabilitySemantics:
+    """Test available_rate and blocking rules - /api/availability"""
+
+    def test_long_stay_is_not_truncated(self, auth_headers):
+        """A closed night beyond the 100th night must still block the room"""
+        room_id = create_test_room(auth_headers)
+        try:
+            check_in, check_out = stay_dates(400, 150)
+            closed_night = (datetime.strptime(check_in, "%Y-%m-%d") + timedelta(days=140)).strftime("%Y-%m-%d")
+
+            response = requests.post(f"{BASE_URL}/api/admin/inventory/bulk-update", json={
+                "room_type_id": room_id,
+                "start_date": check_in,
+                "end_date": closed_night,
+                "allotment": 3,
+                "rate": 900000,
+                "is_closed": False
+            }, headers=auth_headers)
+            assert response.status_code == 200
+
+            response = requests.post(f"{BASE_URL}/api/admin/inventory/bulk-update", json={
+                "room_type_id": room_id,
+                "start_date": closed_night,
+                "end_date": closed_night,
+                "is_closed": True
+            }, headers=auth_headers)
+            assert response.status_code == 200
+
+            response = requests.get(f"{BASE_URL}/api/availability", params={
+                "check_in": check_in, "check_out": check_out
+            })
+            assert response.status_code == 200
+            room_ids = [r["room_type_id"] for r in response.json()]
+            assert room_id not in room_ids, "Closed night after night 100 was ignored"
+            print("✓ Long stay correctly blocked by a late closed night")
+        finally:
+            delete_test_rooms(auth_headers, [room_id])
+
+    def test_stay_over_limit_rejected(self):
+        """Stays longer than the maximum length are rejected"""
+        check_in, check_out = stay_dates(30, 181)
+        response = requests.get(f"{BASE_URL}/api/availability", params={
+            "check_in": check_in, "check_out": check_out
+        })
+        assert response.status_code == 400
+
+    def test_available_rate_is_minimum_of_base_and_rates(self, auth_headers):
+        """available_rate is the lowest of base_price and any nightly rate"""
+        room_id = create_test_room(auth_headers, base_price=1000000)
+        try:
+            check_in, check_out = stay_dates(300, 3)
+            response = requests.post(f"{BASE_URL}/api/admin/inventory/bulk-update", json={
+                "room_type_id": room_id,
+                "start_date": check_in,
+                "end_date": check_in,
+                "allotment": 2,
+                "rate": 750000
+            }, headers=auth_headers)
+            assert response.status_code == 200
+
+            response = requests.get(f"{BASE_URL}/api/availability", params={
+                "check_in": check_in, "check_out": check_out
+            })
+            assert response.status_code == 200
+            room = next(r for r in response.json() if r["room_type_id"] == room_id)
+            assert room["available_rate"] == 750000
+            print(f"✓ available_rate: {room['available_rate']}")
+        finally:
+            delete_test_rooms(auth_headers, [room_id])
+
+
+class TestQuoteEndpoint:
+    """Test the shared pricing service - /api/quote"""
+
+    def test_quote_matches_availability(self, auth_headers):
+        """Quote subtotal equals the sum of its nights and the /availability total"""
+        room_id = create_test_room(auth_headers, base_price=1000000)
+        try:
+            check_in, check_out = stay_dates(320, 3)
+            requests.post(f"{BASE_URL}/api/admin/inventory/bulk-update", json={
+                "room_type_id": room_id,
+                "start_date": check_in,
+                "end_date": check_in,
+                "allotment": 2,
+                "rate": 800000
+            }, headers=auth_headers)
+
+            response = requests.get(f"{BASE_URL}/api/quote", params={
+                "room_type_id": room_id, "check_in": check_in, "check_out": check_out
+            })
+            assert response.status_code == 200
+            quote = response.json()
+            assert quote["nights"] == 3
+            assert [n["rate"] for n in quote["nightly_rates"]] == [800000, 1000000, 1000000]
+            assert quote["subtotal"] == 2800000
+            assert quote["total_amount"] == quote["subtotal"] - quote["discount_amount"]
+
+            available = requests.get(f"{BASE_URL}/api/availability", params={
+                "check_in": check_in, "check_out": check_out
+            }).json()
+            room = next(r for r in available if r["room_type_id"] == room_id)
+            assert room["total_rate"] == quote["subtotal"]
+            print(f"✓ Quote subtotal {quote['subtotal']} matches availability")
+        finally:
+            delete_test_rooms(auth_headers, [room_id])
+
+    def test_quote_unknown_room(self):
+        """Quote for a nonexistent room returns 404"""
+        check_in, check_out = stay_dates(10, 2)
+        response = requests.get(f"{BASE_URL}/api/quote", params={
+            "room_type_id": "nonexistent-room-id", "check_in": check_in, "check_out": check_out
+        })
+        assert response.status_code == 404
+
+    def test_quote_stay_over_limit(self, auth_headers):
+        """Quote for a stay longer than the maximum length returns 400"""
+        room_id = create_test_room(auth_headers)
+        try:
+            check_in, check_out = stay_dates(30, 181)
+            response = requests.get(f"{BASE_URL}/api/quote", params={
+                "room_type_id": room_id, "check_in": check_in, "check_out": check_out
+            })
+            assert response.status_code == 400
+        finally:
+            delete_test_rooms(auth_headers, [room_id])
+
+
+class TestFlexibleSearch:
+    """Test cheapest-stay search over a date window - /api/availability/flexible"""
+
+    def test_cheapest_stay_skips_blocked_nights(self, auth_headers):
+        """The cheapest 2-night stay avoids a sold-out night and is sorted first"""
+        room_id = create_test_room(auth_headers, base_price=1000000)
+        try:
+            window_start, window_end = stay_dates(340, 7)
+            day = lambda n: (datetime.strptime(window_start, "%Y-%m-%d") + timedelta(days=n)).strftime("%Y-%m-%d")
+            # Nights 2-3 are cheap but night 3 is sold out; nights 4-5 are the cheapest bookable pair
+            for night, allotment, rate in [(2, 2, 500000), (3, 0, 500000), (4, 2, 600000), (5, 2, 600000)]:
+                requests.post(f"{BASE_URL}/api/admin/inventory/bulk-update", json={
+                    "room_type_id": room_id,
+                    "start_date": day(night),
+                    "end_date": day(night),
+                    "allotment": allotment,
+                    "rate": rate
+                }, headers=auth_headers)
+
+            response = requests.get(f"{BASE_URL}/api/availability/flexible", params={
+                "start_date": window_start, "end_date": window_end, "nights": 2, "limit": 3
+            })
+            assert response.status_code == 200
+            room = next(r for r in response.json() if r["room_type_id"] == room_id)
+            best = room["stays"][0]
+            assert best["check_in"] == day(4)
+            assert best["total_rate"] == 1200000
+            assert all(s["check_in"] not in (day(2), day(3)) for s in room["stays"])
+            print(f"✓ Cheapest 2-night stay: {best['check_in']} for {best['total_rate']}")
+        finally:
+            delete_test_rooms(auth_headers, [room_id])
+
+    def test_stay_longer_than_window(self):
+        """A stay longer than the window is rejected"""
+        window_start, window_end = stay_dates(30, 2)
+        response = requests.get(f"{BASE_URL}/api/availability/flexible", params={
+            "start_date": window_start, "end_date": window_end, "nights": 3
+        })
+        assert response.status_code == 400
+
+
+class TestAvailabilityBenchmark:
+    """Benchmark /api/availability latency as room types grow from 3 to 200"""
+
+    def measure_latency(self, check_in, check_out):
+        samples = []
+        for _ in range(BENCHMARK_SAMPLES):
+            started = time.perf_counter()
+            response = requests.get(f"{BASE_URL}/api/availability", params={
+                "check_in": check_in, "check_out": check_out
+            })
+            samples.append(time.perf_counter() - started)
+            assert response.status_code == 200
+        return statistics.median(samples)
+
+    def test_latency_stays_flat(self, auth_headers):
+        """Median latency at 200 room types stays within a small factor of 3"""
+        existing = len(requests.get(f"{BASE_URL}/api/rooms").json())
+        if existing > BENCHMARK_SIZES[0]:
+            pytest.skip(f"Benchmark needs at most {BENCHMARK_SIZES[0]} active rooms, found {existing}")
+
+        check_in, check_out = stay_dates(200, 14)
+        created = []
+        results = {}
+        try:
+            for size in BENCHMARK_SIZES:
+                while existing + len(created) < size:
+                    room_id = create_test_room(auth_headers)
+                    requests.post(f"{BASE_URL}/api/admin/inventory/bulk-update", json={
+                        "room_type_id": room_id,
+                        "start_date": check_in,
+                        "end_date": check_out,
+                        "allotment": 5,
+                        "rate": 950000
+                    }, headers=auth_headers)
+                    created.append(room_id)
+                results[size] = self.measure_latency(check_in, check_out)
+                print(f"  {size} room types: {results[size] * 1000:.1f} ms median")
+        finally:
+            delete_test_rooms(auth_headers, created)
+
+        smallest, largest = results[BENCHMARK_SIZES[0]], results[BENCHMARK_SIZES[-1]]
+        # N+1 querying grows ~linearly (60x+ here); a single pass only pays for the larger payload
+        assert largest < smallest * 4 + 0.05, f"Latency grew from {smallest:.3f}s to {largest:.3f}s"
+        print(f"✓ Availability latency flat: {smallest * 1000:.1f} ms -> {largest * 1000:.1f} ms")
+
+
+# Run tests if executed directly
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
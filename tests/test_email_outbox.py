@@ -0,0 +1,159 @@
+"""
+Spencer Green Hotel - Email Outbox Tests
+Enqueue, batch claim, delivery, backoff and giving up
+Runs the outbox in-process against a throwaway database with a fake transport,
+so it needs MONGO_URL (or backend/.env) but no running server
+"""
+import pytest
+import os
+import sys
+import asyncio
+import uuid
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("MONGO_URL") and not (BACKEND_DIR / ".env").exists(),
+    reason="MONGO_URL is not configured"
+)
+
+
+class FakeTransport:
+    """Records each batch instead of sending it, or fails every send"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batches = []
+
+    def send(self, messages):
+        if self.fail:
+            raise RuntimeError("TEST_provider unavailable")
+        self.batches.append([message["message_id"] for message in messages])
+
+
+def run_with_db(test):
+    """Run `await test(db)` with the outbox pointed at a throwaway database"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from config import MONGO_URL
+    import services.outbox as outbox_module
+
+    async def main():
+        client = AsyncIOMotorClient(MONGO_URL)
+        db = client[f"TEST_outbox_{uuid.uuid4().hex[:8]}"]
+        original_db = outbox_module.db
+        outbox_module.db = db
+        try:
+            await test(db)
+        finally:
+            outbox_module.db = original_db
+            await client.drop_database(db.name)
+            client.close()
+
+    asyncio.run(main())
+
+
+def as_utc(value):
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class TestEmailOutbox:
+    """Test the email_outbox queue and worker steps"""
+
+    def test_enqueue_claim_deliver(self):
+        """Enqueued mail is claimed as one batch and marked sent"""
+        from services.outbox import EmailOutbox
+
+        async def test(db):
+            transport = FakeTransport()
+            outbox = EmailOutbox(transport)
+            for i in range(3):
+                await outbox.enqueue([f"test{i}@example.com"], "TEST_Subject", "<p>TEST</p>", "test")
+
+            messages = await outbox.claim_batch()
+            assert len(messages) == 3
+            assert {m["status"] for m in messages} == {"sending"}
+            assert len({m["claim"] for m in messages}) == 1
+            assert await outbox.claim_batch() == [], "Claimed mail was handed out twice"
+
+            await outbox.deliver(messages)
+            assert transport.batches == [[m["message_id"] for m in messages]]
+            docs = await db.email_outbox.find({}, {"_id": 0}).to_list(None)
+            assert {d["status"] for d in docs} == {"sent"}
+            assert all("claim" not in d and d.get("sent_at") for d in docs)
+            assert await outbox.run_once() == 0
+            print("✓ 3 emails claimed in one batch and delivered")
+
+        run_with_db(test)
+
+    def test_failure_backs_off(self):
+        """A failed send goes back to pending with exponential backoff"""
+        from services.outbox import EmailOutbox, backoff
+
+        async def test(db):
+            outbox = EmailOutbox(FakeTransport(fail=True))
+            await outbox.enqueue(["test@example.com"], "TEST_Subject", "<p>TEST</p>", "test")
+
+            before = datetime.now(timezone.utc)
+            assert await outbox.run_once() == 1
+            doc = await db.email_outbox.find_one({}, {"_id": 0})
+            assert doc["status"] == "pending"
+            assert doc["attempts"] == 1
+            assert "TEST_provider unavailable" in doc["last_error"]
+            assert "claim" not in doc
+            assert as_utc(doc["next_attempt_at"]) >= before + backoff(1) - timedelta(seconds=1)
+            assert backoff(2) == 2 * backoff(1)
+            assert await outbox.run_once() == 0, "Message was retried before its backoff elapsed"
+            print(f"✓ Failed email rescheduled {backoff(1)} later")
+
+        run_with_db(test)
+
+    def test_gives_up_after_max_attempts(self):
+        """The last allowed failure marks the message failed for good"""
+        from services.outbox import EmailOutbox, MAX_ATTEMPTS
+
+        async def test(db):
+            outbox = EmailOutbox(FakeTransport(fail=True))
+            await outbox.enqueue(["test@example.com"], "TEST_Subject", "<p>TEST</p>", "test")
+            await db.email_outbox.update_many({}, {"$set": {
+                "attempts": MAX_ATTEMPTS - 1,
+                "next_attempt_at": datetime.now(timezone.utc) - timedelta(minutes=1)
+            }})
+
+            assert await outbox.run_once() == 1
+            doc = await db.email_outbox.find_one({}, {"_id": 0})
+            assert doc["status"] == "failed"
+            assert doc["attempts"] == MAX_ATTEMPTS
+            await db.email_outbox.update_many({}, {"$set": {"next_attempt_at": datetime.now(timezone.utc) - timedelta(minutes=1)}})
+            assert await outbox.run_once() == 0, "Failed message was claimed again"
+            print(f"✓ Email marked failed after {MAX_ATTEMPTS} attempts")
+
+        run_with_db(test)
+
+    def test_stale_claim_is_reclaimed(self):
+        """Mail left in "sending" by a dead worker is claimed again"""
+        from services.outbox import EmailOutbox, CLAIM_TIMEOUT
+
+        async def test(db):
+            transport = FakeTransport()
+            outbox = EmailOutbox(transport)
+            await outbox.enqueue(["test@example.com"], "TEST_Subject", "<p>TEST</p>", "test")
+            await db.email_outbox.update_many({}, {"$set": {
+                "status": "sending",
+                "claim": "TEST_dead_worker",
+                "claimed_at": datetime.now(timezone.utc) - CLAIM_TIMEOUT - timedelta(minutes=1)
+            }})
+
+            assert await outbox.run_once() == 1
+            doc = await db.email_outbox.find_one({}, {"_id": 0})
+            assert doc["status"] == "sent"
+            assert len(transport.batches) == 1
+            print("✓ Stale claim picked up and delivered")
+
+        run_with_db(test)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
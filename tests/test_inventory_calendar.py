@@ -0,0 +1,98 @@
+"""
+Spencer Green Hotel - Inventory Calendar Tests
+claim_nights against a calendar that is older than the database
+Runs in-process against a throwaway database, so it needs MONGO_URL
+(or backend/.env) but no running server
+"""
+import pytest
+import os
+import sys
+import asyncio
+import uuid
+from datetime import date
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+pytestmark = pytest.mark.skipif(
+    not os.environ.get("MONGO_URL") and not (BACKEND_DIR / ".env").exists(),
+    reason="MONGO_URL is not configured"
+)
+
+ROOM = "TEST_room"
+
+
+def run_with_db(test):
+    """Run `await test(db, calendar)` with a fresh InventoryCalendar on a throwaway database"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from config import MONGO_URL
+    import services.inventory_calendar as calendar_module
+
+    async def main():
+        client = AsyncIOMotorClient(MONGO_URL)
+        db = client[f"TEST_calendar_{uuid.uuid4().hex[:8]}"]
+        original_db = calendar_module.db
+        calendar_module.db = db
+        try:
+            await test(db, calendar_module.InventoryCalendar())
+        finally:
+            calendar_module.db = original_db
+            await client.drop_database(db.name)
+            client.close()
+
+    asyncio.run(main())
+
+
+def night_doc(ordinal, allotment):
+    from services.inventory_calendar import format_date
+    return {"room_type_id": ROOM, "date": format_date(ordinal), "allotment": allotment, "rate": 900000, "is_closed": False}
+
+
+async def allotments(db):
+    docs = await db.room_inventory.find({"room_type_id": ROOM}, {"_id": 0}).sort("date", 1).to_list(None)
+    return [(d["allotment"], d.get("holds", [])) for d in docs]
+
+
+class TestClaimNights:
+    """Test claim_nights when another worker changed inventory after the calendar loaded"""
+
+    def test_sold_out_night_rolls_back(self):
+        """A night sold out behind a cached calendar releases the earlier nights and their holds"""
+        from fastapi import HTTPException
+
+        async def test(db, calendar):
+            start = date.today().toordinal() + 30
+            await db.room_inventory.insert_many([night_doc(start + i, 1) for i in range(4)])
+            assert (await calendar.get(ROOM, start, start + 4)).is_available(start, start + 4)
+            await db.room_inventory.update_one({"room_type_id": ROOM, "date": night_doc(start + 3, 0)["date"]}, {"$set": {"allotment": 0}})
+
+            with pytest.raises(HTTPException) as error:
+                await calendar.claim_nights(ROOM, start, start + 4, "TEST_res")
+            assert error.value.status_code == 409
+            assert await allotments(db) == [(1, []), (1, []), (1, []), (0, [])]
+            print("✓ Stale claim rolled back to [1, 1, 1, 0] with no holds left")
+
+        run_with_db(test)
+
+    def test_night_created_after_load_is_claimed(self):
+        """A night stored after the calendar loaded is decremented too"""
+        async def test(db, calendar):
+            start = date.today().toordinal() + 30
+            await db.room_inventory.insert_many([night_doc(start, 1), night_doc(start + 1, 1)])
+            await calendar.get(ROOM, start, start + 3)
+            await db.room_inventory.insert_one(night_doc(start + 2, 1))
+
+            await calendar.claim_nights(ROOM, start, start + 3, "TEST_res")
+            assert [a for a, _ in await allotments(db)] == [0, 0, 0]
+            assert not (await calendar.get(ROOM, start, start + 3)).is_available(start, start + 3)
+
+            with pytest.raises(Exception):
+                await calendar.claim_nights(ROOM, start + 2, start + 3, "TEST_res2")
+            print("✓ Night created after load was claimed and cannot be oversold")
+
+        run_with_db(test)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
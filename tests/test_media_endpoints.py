@@ -87,6 +87,17 @@ class TestMediaUploadValidation:
         assert response.status_code == 400, f"Expected 400, got {response.status_code}"
         print("✓ Text file correctly rejected")
     
+    def test_gallery_upload_oversized_image(self, auth_token):
+        """Test gallery upload stops an image larger than the 10MB limit"""
+        files = {'file': ('big.jpg', b'\xff' * (10 * 1024 * 1024 + 1), 'image/jpeg')}
+        response = requests.post(
+            f"{BASE_URL}/api/media/upload/gallery",
+            files=files,
+            headers={"Authorization": f"Bearer {auth_token}"}
+        )
+        assert response.status_code == 413, f"Expected 413, got {response.status_code}"
+        print(f"✓ Oversized image rejected: {response.json()['detail']}")
+    
     def test_room_image_upload_missing_room_type_id(self, auth_token):
         """Test room image upload requires room_type_id"""
         files = {'file': ('test.jpg', b'fake image content', 'image/jpeg')}
@@ -0,0 +1,239 @@
+"""
+Spencer Green Hotel - Reservation Concurrency Tests
+Stress tests for atomic multi-night allotment decrements
+Endpoints: /api/reservations, /api/inventory, /api/admin/inventory/bulk-update, /api/admin/promo-codes
+"""
+import pytest
+import requests
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import uuid
+
+# Get BASE_URL from environment
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+# Test credentials
+ADMIN_EMAIL = "admin@spencergreenhotel.com"
+ADMIN_PASSWORD = "admin123"
+
+CONCURRENT_BOOKINGS = 300
+WORKERS = 50
+
+
+@pytest.fixture(scope="module")
+def auth_headers():
+    """Get headers with admin auth token"""
+    response = requests.post(f"{BASE_URL}/api/auth/login", json={
+        "email": ADMIN_EMAIL,
+        "password": ADMIN_PASSWORD
+    })
+    if response.status_code != 200:
+        pytest.skip("Authentication failed - cannot run concurrency tests")
+    return {
+        "Authorization": f"Bearer {response.json()['token']}",
+        "Content-Type": "application/json"
+    }
+
+
+@pytest.fixture
+def last_room(auth_headers):
+    """A fresh room type with exactly one room left on every night of a 4-night stay"""
+    response = requests.post(f"{BASE_URL}/api/admin/rooms", json={
+        "name": f"TEST_LastRoom_{uuid.uuid4().hex[:8]}",
+        "description": "Room created by reservation concurrency tests",
+        "base_price": 1000000,
+        "max_guests": 2
+    }, headers=auth_headers)
+    assert response.status_code == 200, f"Create room failed: {response.text}"
+    room_id = response.json()["room_type_id"]
+
+    check_in = datetime.now() + timedelta(days=500)
+    check_out = check_in + timedelta(days=4)
+    stay = {
+        "room_type_id": room_id,
+        "check_in": check_in.strftime("%Y-%m-%d"),
+        "check_out": check_out.strftime("%Y-%m-%d")
+    }
+
+    response = requests.post(f"{BASE_URL}/api/admin/inventory/bulk-update", json={
+        "room_type_id": room_id,
+        "start_date": stay["check_in"],
+        "end_date": (check_out - timedelta(days=1)).strftime("%Y-%m-%d"),
+        "allotment": 1,
+        "rate": 900000,
+        "is_closed": False
+    }, headers=auth_headers)
+    assert response.status_code == 200
+
+    yield stay
+    requests.delete(f"{BASE_URL}/api/admin/rooms/{room_id}", headers=auth_headers)
+
+
+class TestLastRoomStress:
+    """Fire hundreds of simultaneous bookings at a single remaining room"""
+
+    def book(self, stay, index):
+        response = requests.post(f"{BASE_URL}/api/reservations", json={
+            "guest_name": f"TEST_Guest_{index}",
+            "guest_email": f"test_guest_{index}@example.com",
+            "guest_phone": "081234567890",
+            "guests": 1,
+            **stay
+        })
+        return response.status_code
+
+    def test_exactly_one_booking_wins(self, last_room):
+        """Only one booking succeeds and no night is driven below zero"""
+        with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+            statuses = list(pool.map(lambda i: self.book(last_room, i), range(CONCURRENT_BOOKINGS)))
+
+        succeeded = statuses.count(200)
+        rejected = sum(1 for s in statuses if s in (400, 409))
+        assert succeeded == 1, f"{succeeded} bookings succeeded for the last room"
+        assert rejected == CONCURRENT_BOOKINGS - 1, f"Unexpected statuses: {set(statuses)}"
+
+        response = requests.get(f"{BASE_URL}/api/inventory", params={
+            "room_type_id": last_room["room_type_id"],
+            "start_date": last_room["check_in"],
+            "end_date": last_room["check_out"]
+        })
+        assert response.status_code == 200
+        allotments = [inv["allotment"] for inv in response.json() if inv["date"] < last_room["check_out"]]
+        assert allotments == [0, 0, 0, 0], f"Allotment after stress: {allotments}"
+        print(f"✓ {CONCURRENT_BOOKINGS} concurrent bookings: 1 succeeded, allotment {allotments}")
+
+    def test_partial_failure_rolls_back(self, last_room, auth_headers):
+        """A stay whose last night is sold out is refused without touching earlier nights
+
+        The admin update refreshes this process's calendar, so the quote check
+        refuses the stay; the claim_nights rollback against a stale calendar is
+        covered in test_inventory_calendar.py
+        """
+        last_night = (datetime.strptime(last_room["check_out"], "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d")
+        response = requests.post(f"{BASE_URL}/api/admin/inventory/bulk-update", json={
+            "room_type_id": last_room["room_type_id"],
+            "start_date": last_night,
+            "end_date": last_night,
+            "allotment": 0
+        }, headers=auth_headers)
+        assert response.status_code == 200
+
+        assert self.book(last_room, "rollback") in (400, 409)
+
+        response = requests.get(f"{BASE_URL}/api/inventory", params={
+            "room_type_id": last_room["room_type_id"],
+            "start_date": last_room["check_in"],
+            "end_date": last_night
+        })
+        allotments = [inv["allotment"] for inv in response.json()]
+        assert allotments == [1, 1, 1, 0], f"Allotment after rejected booking: {allotments}"
+        print(f"✓ Rejected booking left allotment at {allotments}")
+
+
+class TestIdempotentRetries:
+    """Retry storms carrying one Idempotency-Key create a single booking"""
+
+    def test_retry_storm_books_once(self, last_room, auth_headers):
+        """Concurrent and late retries with the same key share one reservation"""
+        response = requests.post(f"{BASE_URL}/api/admin/inventory/bulk-update", json={
+            "room_type_id": last_room["room_type_id"],
+            "start_date": last_room["check_in"],
+            "end_date": (datetime.strptime(last_room["check_out"], "%Y-%m-%d") - timedelta(days=1)).strftime("%Y-%m-%d"),
+            "allotment": 5
+        }, headers=auth_headers)
+        assert response.status_code == 200
+
+        key = f"TEST_{uuid.uuid4().hex}"
+        body = {
+            "guest_name": "TEST_Guest_Retry",
+            "guest_email": "test_guest_retry@example.com",
+            "guest_phone": "081234567890",
+            "guests": 1,
+            **last_room
+        }
+        post = lambda _: requests.post(f"{BASE_URL}/api/reservations", json=body, headers={"Idempotency-Key": key})
+        with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+            responses = list(pool.map(post, range(WORKERS)))
+
+        assert all(r.status_code in (200, 409) for r in responses), f"Statuses: {set(r.status_code for r in responses)}"
+        late = post(None)
+        assert late.status_code == 200
+        assert late.headers.get("Idempotent-Replayed") == "true"
+        reservation_ids = {r.json()["reservation_id"] for r in responses + [late] if r.status_code == 200}
+        assert len(reservation_ids) == 1
+
+        response = requests.get(f"{BASE_URL}/api/inventory", params={
+            "room_type_id": last_room["room_type_id"],
+            "start_date": last_room["check_in"],
+            "end_date": last_room["check_out"]
+        })
+        allotments = [inv["allotment"] for inv in response.json() if inv["date"] < last_room["check_out"]]
+        assert allotments == [4, 4, 4, 4], f"Allotment after retries: {allotments}"
+        print(f"✓ {WORKERS + 1} retries with one key booked once, allotment {allotments}")
+
+    def test_key_reused_with_different_body(self, last_room):
+        """Reusing a key for a different request is rejected"""
+        key = f"TEST_{uuid.uuid4().hex}"
+        body = {
+            "guest_name": "TEST_Guest_Reuse",
+            "guest_email": "test_guest_reuse@example.com",
+            "guest_phone": "081234567890",
+            "guests": 1,
+            **last_room
+        }
+        requests.post(f"{BASE_URL}/api/reservations", json=body, headers={"Idempotency-Key": key})
+        response = requests.post(f"{BASE_URL}/api/reservations", json={**body, "guests": 2}, headers={"Idempotency-Key": key})
+        assert response.status_code == 422
+
+
+class TestPromoRedemption:
+    """Limited promo codes under a burst of simultaneous bookings"""
+
+    def test_flash_sale_never_oversells_promo(self, last_room, auth_headers):
+        """Concurrent bookings redeem a limited promo exactly max_usage times"""
+        requests.post(f"{BASE_URL}/api/admin/inventory/bulk-update", json={
+            "room_type_id": last_room["room_type_id"],
+            "start_date": last_room["check_in"],
+            "end_date": last_room["check_out"],
+            "allotment": WORKERS * 2
+        }, headers=auth_headers)
+        code = f"TESTFLASH{uuid.uuid4().hex[:6]}".upper()
+        response = requests.post(f"{BASE_URL}/api/admin/promo-codes", json={
+            "code": code,
+            "discount_type": "percent",
+            "discount_value": 50,
+            "max_usage": 5,
+            "valid_from": "2020-01-01",
+            "valid_until": "2099-12-31"
+        }, headers=auth_headers)
+        assert response.status_code == 200
+        promo_id = response.json()["promo_id"]
+
+        def book(index):
+            return requests.post(f"{BASE_URL}/api/reservations", json={
+                "guest_name": f"TEST_Guest_Flash_{index}",
+                "guest_email": f"test_guest_flash_{index}@example.com",
+                "guest_phone": "081234567890",
+                "guests": 1,
+                "promo_code": code,
+                **last_room
+            })
+
+        try:
+            with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+                responses = list(pool.map(book, range(WORKERS)))
+            discounted = [r for r in responses if r.status_code == 200 and r.json()["promo_code"] == code]
+            assert len(discounted) == 5, f"{len(discounted)} bookings got the 5-use promo"
+            assert all(r.status_code in (200, 409) for r in responses)
+
+            promo = next(p for p in requests.get(f"{BASE_URL}/api/admin/promo-codes", headers=auth_headers).json() if p["promo_id"] == promo_id)
+            assert promo["current_usage"] == 5
+            print(f"✓ {WORKERS} concurrent promo bookings, {len(discounted)} redeemed")
+        finally:
+            requests.delete(f"{BASE_URL}/api/admin/promo-codes/{promo_id}", headers=auth_headers)
+
+
+# Run tests if executed directly
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
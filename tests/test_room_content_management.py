@@ -5,6 +5,8 @@ Tests for new features: Room CRUD and Content CMS endpoints
 import pytest
 import requests
 import os
+import csv
+import io
 from datetime import datetime, timedelta
 import uuid
 
@@ -442,6 +444,91 @@ class TestRoomInventoryIntegration:
         assert "Updated" in data["message"]
         print(f"✓ Bulk inventory update: {data['message']}")
 
+    def test_inventory_keyset_pagination(self, auth_headers):
+        """Test GET /api/inventory pages with X-Next-Cursor cover the full range once"""
+        start_date = datetime.now().strftime("%Y-%m-%d")
+        end_date = (datetime.now() + timedelta(days=60)).strftime("%Y-%m-%d")
+        params = {"start_date": start_date, "end_date": end_date}
+
+        full = requests.get(f"{BASE_URL}/api/inventory", params=params).json()
+
+        paged = []
+        after = None
+        while True:
+            page_params = {**params, "limit": 25}
+            if after:
+                page_params["after"] = after
+            response = requests.get(f"{BASE_URL}/api/inventory", params=page_params)
+            assert response.status_code == 200
+            page = response.json()
+            assert len(page) <= 25
+            paged.extend(page)
+            after = response.headers.get("X-Next-Cursor")
+            if not after:
+                break
+
+        assert sorted(inv["inventory_id"] for inv in paged) == sorted(inv["inventory_id"] for inv in full)
+        print(f"✓ Inventory paged through {len(paged)} records")
+
+    def test_inventory_csv_export(self, auth_headers):
+        """Test GET /api/admin/exports/inventory streams one CSV row per inventory record"""
+        start_date = datetime.now().strftime("%Y-%m-%d")
+        end_date = (datetime.now() + timedelta(days=60)).strftime("%Y-%m-%d")
+        params = {"start_date": start_date, "end_date": end_date}
+
+        response = requests.get(f"{BASE_URL}/api/admin/exports/inventory", params=params, headers=auth_headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        assert "attachment" in response.headers.get("content-disposition", "")
+
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        expected = requests.get(f"{BASE_URL}/api/inventory", params=params).json()
+        assert len(rows) == len(expected)
+        print(f"✓ Inventory CSV export: {len(rows)} rows")
+
+    def test_bulk_update_weekday_pattern(self, auth_headers):
+        """Test POST /api/admin/inventory/bulk-update with several rooms and weekday rates"""
+        rooms_response = requests.get(f"{BASE_URL}/api/rooms")
+        rooms = rooms_response.json()
+
+        if len(rooms) < 2:
+            pytest.skip("Need at least two rooms")
+
+        room_ids = [rooms[0]["room_type_id"], rooms[1]["room_type_id"]]
+        # Two full weeks starting on a Monday
+        start = datetime.now() + timedelta(days=60)
+        start -= timedelta(days=start.weekday())
+        end = start + timedelta(days=13)
+
+        bulk_data = {
+            "room_type_ids": room_ids,
+            "start_date": start.strftime("%Y-%m-%d"),
+            "end_date": end.strftime("%Y-%m-%d"),
+            "weekdays": [4, 5],
+            "rate": 950000,
+            "weekday_rates": {"5": 1250000}
+        }
+
+        response = requests.post(
+            f"{BASE_URL}/api/admin/inventory/bulk-update",
+            json=bulk_data,
+            headers=auth_headers
+        )
+        assert response.status_code == 200, f"Bulk update failed: {response.text}"
+        assert response.json()["message"] == "Updated 4 days for 2 room types"
+
+        inventory = requests.get(f"{BASE_URL}/api/inventory", params={
+            "room_type_id": room_ids[1],
+            "start_date": bulk_data["start_date"],
+            "end_date": bulk_data["end_date"]
+        }).json()
+        rates = {inv["date"]: inv["rate"] for inv in inventory}
+        friday = (start + timedelta(days=4)).strftime("%Y-%m-%d")
+        saturday = (start + timedelta(days=5)).strftime("%Y-%m-%d")
+        assert rates[friday] == 950000
+        assert rates[saturday] == 1250000
+        print(f"✓ Weekday bulk update: Fri {rates[friday]}, Sat {rates[saturday]}")
+
 
 # Run tests if executed directly
 if __name__ == "__main__":
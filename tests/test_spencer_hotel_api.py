@@ -1,11 +1,13 @@
 """
 Spencer Green Hotel HMS API Tests
 Tests for refactored modular backend structure
-Routes tested: auth, rooms, reservations, admin, content, reviews
+Routes tested: auth, rooms, reservations, admin, content, bootstrap, reviews, promo
 """
 import pytest
 import requests
 import os
+import csv
+import io
 from datetime import datetime, timedelta
 
 # Get BASE_URL from environment
@@ -214,6 +216,48 @@ class TestContentEndpoints:
         data = response.json()
         assert isinstance(data, list)
         print(f"✓ GET /api/content/home returned {len(data)} items")
+    
+    def test_page_content_not_modified(self):
+        """Test GET /api/content/{page} answers a matching If-None-Match with 304"""
+        response = requests.get(f"{BASE_URL}/api/content/home")
+        assert response.status_code == 200
+        etag = response.headers.get("ETag")
+        assert etag
+        assert "no-cache" in response.headers.get("Cache-Control", "")
+        
+        response = requests.get(f"{BASE_URL}/api/content/home", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.headers.get("ETag") == etag
+        print(f"✓ Repeat GET /api/content/home with ETag {etag} returned 304")
+    
+    def test_page_bootstrap(self):
+        """Test GET /api/bootstrap/{page} bundles content, rooms, reviews and settings"""
+        response = requests.get(f"{BASE_URL}/api/bootstrap/home")
+        assert response.status_code == 200
+        data = response.json()
+        
+        assert data["page"] == "home"
+        for key in ("content", "global", "rooms", "reviews"):
+            assert isinstance(data[key], list)
+        assert "whatsapp" in data["settings"]
+        for room in data["rooms"]:
+            assert "_id" not in room
+            assert room["starting_rate"] <= room["base_price"]
+        
+        response = requests.get(f"{BASE_URL}/api/bootstrap/home", headers={"If-None-Match": response.headers["ETag"]})
+        assert response.status_code == 304
+        print(f"✓ GET /api/bootstrap/home returned {len(data['content'])} sections, {len(data['rooms'])} rooms, {len(data['reviews'])} reviews")
+    
+    def test_page_bootstrap_compressed(self):
+        """Test GET /api/bootstrap/{page} is gzip-encoded when the client accepts it"""
+        response = requests.get(f"{BASE_URL}/api/bootstrap/home", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert "Accept-Encoding" in response.headers.get("Vary", "")
+        if len(response.content) >= 1024:
+            assert response.headers.get("Content-Encoding") == "gzip"
+        else:
+            assert "Content-Encoding" not in response.headers
+        print(f"✓ GET /api/bootstrap/home encoding: {response.headers.get('Content-Encoding', 'identity')}")
 
 
 class TestReviewsEndpoints:
@@ -251,6 +295,99 @@ class TestReviewsEndpoints:
         data = response.json()
         assert "message" in data
         print(f"✓ Review created: {data['message']}")
+    
+    def test_review_summary(self):
+        """Test GET /api/reviews/summary returns count, mean and histogram"""
+        before = requests.get(f"{BASE_URL}/api/reviews/summary").json()
+        requests.post(f"{BASE_URL}/api/reviews", json={
+            "guest_name": "TEST_Reviewer",
+            "guest_email": "test_reviewer@example.com",
+            "rating": 4,
+            "comment": "Test review - summary",
+            "reservation_id": ""
+        })
+        
+        response = requests.get(f"{BASE_URL}/api/reviews/summary")
+        assert response.status_code == 200
+        data = response.json()
+        assert set(data["histogram"]) == {"1", "2", "3", "4", "5"}
+        assert sum(data["histogram"].values()) == data["count"]
+        assert data["pending"] == before["pending"] + 1
+        assert isinstance(data["room_types"], list)
+        print(f"✓ Review summary: {data['count']} reviews, mean {data['mean']}, {data['pending']} pending")
+
+
+class TestReviewModeration:
+    """Test the review moderation queue - /api/admin/reviews (requires auth)"""
+    
+    @pytest.fixture
+    def auth_headers(self):
+        """Get headers with admin auth token"""
+        response = requests.post(f"{BASE_URL}/api/auth/login", json={
+            "email": ADMIN_EMAIL,
+            "password": ADMIN_PASSWORD
+        })
+        if response.status_code == 200:
+            return {"Authorization": f"Bearer {response.json()['token']}"}
+        pytest.skip("Authentication failed")
+    
+    def test_pending_queue_paged(self, auth_headers):
+        """Test keyset pages of pending reviews never repeat a review"""
+        for i in range(3):
+            requests.post(f"{BASE_URL}/api/reviews", json={
+                "guest_name": f"TEST_Moderation_{i}",
+                "guest_email": "test_moderation@example.com",
+                "rating": 3,
+                "comment": "Test review - moderation queue"
+            })
+        
+        seen, after = [], None
+        for _ in range(3):
+            params = {"is_visible": False, "limit": 1}
+            if after:
+                params["after"] = after
+            response = requests.get(f"{BASE_URL}/api/admin/reviews", params=params, headers=auth_headers)
+            assert response.status_code == 200
+            page = response.json()
+            assert len(page) == 1
+            assert page[0]["is_visible"] is False
+            seen.append(page[0]["review_id"])
+            after = response.headers.get("X-Next-Cursor")
+            if not after:
+                break
+        assert len(seen) == len(set(seen))
+        print(f"✓ Moderation queue paged through {len(seen)} pending reviews")
+    
+    def test_bulk_visibility(self, auth_headers):
+        """Test approving and hiding several reviews in one call"""
+        for i in range(3):
+            requests.post(f"{BASE_URL}/api/reviews", json={
+                "guest_name": f"TEST_Bulk_{i}",
+                "guest_email": "test_bulk@example.com",
+                "rating": 5,
+                "comment": "Test review - bulk moderation"
+            })
+        pending = requests.get(f"{BASE_URL}/api/admin/reviews", params={"is_visible": False, "limit": 50}, headers=auth_headers).json()
+        review_ids = [r["review_id"] for r in pending if r["guest_name"].startswith("TEST_Bulk_")][:3]
+        assert len(review_ids) == 3
+        
+        before = requests.get(f"{BASE_URL}/api/reviews/summary").json()
+        response = requests.post(f"{BASE_URL}/api/admin/reviews/bulk-visibility", json={
+            "review_ids": review_ids,
+            "is_visible": True
+        }, headers=auth_headers)
+        assert response.status_code == 200
+        assert response.json()["updated"] == 3
+        after = requests.get(f"{BASE_URL}/api/reviews/summary").json()
+        assert after["count"] == before["count"] + 3
+        
+        response = requests.post(f"{BASE_URL}/api/admin/reviews/bulk-visibility", json={
+            "review_ids": review_ids,
+            "is_visible": False
+        }, headers=auth_headers)
+        assert response.json()["updated"] == 3
+        assert requests.get(f"{BASE_URL}/api/reviews/summary").json()["count"] == before["count"]
+        print(f"✓ Bulk approved and hid {len(review_ids)} reviews")
 
 
 class TestReservationsEndpoints:
@@ -381,6 +518,58 @@ class TestAdminDashboard:
         assert response.status_code in [401, 403]
         print("✓ Dashboard correctly requires authentication")
 
+    def test_index_report(self, auth_token):
+        """Test GET /api/admin/indexes reports no missing manifest indexes"""
+        response = requests.get(
+            f"{BASE_URL}/api/admin/indexes",
+            headers={"Authorization": f"Bearer {auth_token}"}
+        )
+        assert response.status_code == 200
+        report = {entry["collection"]: entry for entry in response.json()}
+
+        assert "room_inventory" in report
+        assert "reservations" in report
+        for collection, entry in report.items():
+            assert entry["missing"] == [], f"{collection} is missing indexes: {entry['missing']}"
+        print(f"✓ Index report covers {len(report)} collections, none missing")
+
+    def test_stats_rebuild_keeps_monthly_revenue(self, auth_token):
+        """Test POST /api/admin/stats/rebuild agrees with the incrementally maintained totals"""
+        headers = {"Authorization": f"Bearer {auth_token}"}
+        before = requests.get(f"{BASE_URL}/api/admin/dashboard", headers=headers).json()
+
+        response = requests.post(f"{BASE_URL}/api/admin/stats/rebuild", headers=headers)
+        assert response.status_code == 200
+
+        after = requests.get(f"{BASE_URL}/api/admin/dashboard", headers=headers).json()
+        assert after["monthly_revenue"] == pytest.approx(before["monthly_revenue"])
+        print(f"✓ {response.json()['message']}, monthly revenue IDR {after['monthly_revenue']}")
+
+    def test_performance_report(self, auth_token):
+        """Test GET /api/admin/reports/performance returns one entry per period"""
+        response = requests.get(
+            f"{BASE_URL}/api/admin/reports/performance",
+            params={"start_date": "2025-01-01", "end_date": "2025-12-31", "granularity": "month"},
+            headers={"Authorization": f"Bearer {auth_token}"}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert [p["period"] for p in data["total"]] == [f"2025-{m:02d}" for m in range(1, 13)]
+        for period in data["total"]:
+            assert period["rooms_sold"] <= period["rooms_available"] or period["rooms_available"] == 0
+            for field in ["occupancy", "adr", "revpar", "pickup", "pickup_revenue"]:
+                assert field in period
+        print(f"✓ Performance report: {len(data['room_types'])} room types x {len(data['total'])} months")
+
+    def test_performance_report_invalid_granularity(self, auth_token):
+        """Test an unknown granularity returns 400"""
+        response = requests.get(
+            f"{BASE_URL}/api/admin/reports/performance",
+            params={"start_date": "2025-01-01", "end_date": "2025-01-31", "granularity": "year"},
+            headers={"Authorization": f"Bearer {auth_token}"}
+        )
+        assert response.status_code == 400
+
 
 class TestAdminReservations:
     """Test admin reservation management - /api/admin/reservations/*"""
@@ -430,6 +619,66 @@ class TestAdminReservations:
             assert res["status"] == "pending"
         print(f"✓ Filtered reservations (pending): {len(data)}")
 
+    def test_get_reservations_stay_overlap_paged(self, auth_token):
+        """Test stay_from/stay_to overlap filter with keyset pages and X-Total-Count"""
+        stay_from = datetime.now().strftime("%Y-%m-%d")
+        stay_to = (datetime.now() + timedelta(days=90)).strftime("%Y-%m-%d")
+        params = {"stay_from": stay_from, "stay_to": stay_to, "limit": 5}
+
+        seen = []
+        total = None
+        after = None
+        while True:
+            response = requests.get(
+                f"{BASE_URL}/api/admin/reservations",
+                params={**params, "after": after} if after else params,
+                headers={"Authorization": f"Bearer {auth_token}"}
+            )
+            assert response.status_code == 200
+            total = int(response.headers["X-Total-Count"])
+            assert "X-Total-Count-Capped" not in response.headers
+            for res in response.json():
+                assert res["check_in"] < stay_to and res["check_out"] > stay_from
+                seen.append(res["reservation_id"])
+            after = response.headers.get("X-Next-Cursor")
+            if not after:
+                break
+
+        assert len(seen) == len(set(seen)) == total
+        print(f"✓ Stays overlapping the next 90 days: {total}")
+
+    def test_export_keeps_phone_numbers(self, auth_token):
+        """Test the CSV export leaves +62 phone numbers as entered but escapes formulas"""
+        rooms = requests.get(f"{BASE_URL}/api/rooms").json()
+        if not rooms:
+            pytest.skip("No rooms available")
+        
+        check_in = datetime.now() + timedelta(days=40)
+        response = requests.post(f"{BASE_URL}/api/reservations", json={
+            "guest_name": "TEST_Export",
+            "guest_email": "test_export@example.com",
+            "guest_phone": "+6281234567890",
+            "room_type_id": rooms[0]["room_type_id"],
+            "check_in": check_in.strftime("%Y-%m-%d"),
+            "check_out": (check_in + timedelta(days=1)).strftime("%Y-%m-%d"),
+            "guests": 1,
+            "special_requests": "=HYPERLINK(\"http://example.com\")"
+        })
+        assert response.status_code == 200, f"Reservation failed: {response.text}"
+        booking_code = response.json()["booking_code"]
+        
+        response = requests.get(
+            f"{BASE_URL}/api/admin/exports/reservations",
+            params={"start_date": datetime.now().strftime("%Y-%m-%d")},
+            headers={"Authorization": f"Bearer {auth_token}"}
+        )
+        assert response.status_code == 200
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        row = next(row for row in rows if row["booking_code"] == booking_code)
+        assert row["guest_phone"] == "+6281234567890"
+        assert row["special_requests"] == "'=HYPERLINK(\"http://example.com\")"
+        print(f"✓ Exported {booking_code} with phone {row['guest_phone']}")
+
 
 class TestAdminUsers:
     """Test admin user management - /api/admin/users/*"""
@@ -499,6 +748,141 @@ class TestInventoryEndpoints:
         print(f"✓ Filtered inventory ({start_date} to {end_date}): {len(data)} records")
 
 
+class TestPromoRules:
+    """Test promo code conditions and discount tiers - /api/admin/promo-codes, /api/promo/validate"""
+    
+    @pytest.fixture
+    def auth_headers(self):
+        """Get headers with admin auth token"""
+        response = requests.post(f"{BASE_URL}/api/auth/login", json={
+            "email": ADMIN_EMAIL,
+            "password": ADMIN_PASSWORD
+        })
+        if response.status_code == 200:
+            return {"Authorization": f"Bearer {response.json()['token']}"}
+        pytest.skip("Authentication failed")
+    
+    def test_tiered_promo(self, auth_headers):
+        """Test early-bird and weekday tiers stack, and min_nights gates the code"""
+        rooms = requests.get(f"{BASE_URL}/api/rooms").json()
+        if not rooms:
+            pytest.skip("No rooms available")
+        room_type_id = rooms[0]["room_type_id"]
+        
+        today = datetime.now()
+        monday = today + timedelta(days=(7 - today.weekday()) + 70)
+        code = f"TESTTIER{datetime.now().strftime('%H%M%S%f')}"
+        response = requests.post(f"{BASE_URL}/api/admin/promo-codes", json={
+            "code": code,
+            "discount_type": "percent",
+            "discount_value": 0,
+            "max_usage": 100,
+            "valid_from": "2020-01-01",
+            "valid_until": "2099-12-31",
+            "min_nights": 2,
+            "rules": [
+                {"discount_type": "percent", "discount_value": 20, "early_bird_days": 60, "priority": 10, "stackable": True},
+                {"discount_type": "percent", "discount_value": 10, "weekdays": [0, 1, 2, 3], "priority": 5, "stackable": True}
+            ]
+        }, headers=auth_headers)
+        assert response.status_code == 200
+        promo_id = response.json()["promo_id"]
+        
+        def validate(nights, promo_code=code):
+            return requests.post(f"{BASE_URL}/api/promo/validate", json={
+                "code": promo_code,
+                "room_type_id": room_type_id,
+                "check_in": monday.strftime("%Y-%m-%d"),
+                "check_out": (monday + timedelta(days=nights)).strftime("%Y-%m-%d")
+            }).json()
+        
+        try:
+            stay = validate(2)
+            assert stay["valid"] is True
+            assert stay["discount_amount"] == pytest.approx(stay["subtotal"] * 0.28)
+            too_short = validate(1)
+            assert too_short["valid"] is False
+            unknown = validate(2, f"{code}X")
+            assert unknown["valid"] is False
+            assert unknown["message"] == too_short["message"], "Unknown codes can be told apart from real ones"
+            print(f"✓ Tiered promo {code}: {stay['discount_amount']} off {stay['subtotal']}")
+        finally:
+            requests.delete(f"{BASE_URL}/api/admin/promo-codes/{promo_id}", headers=auth_headers)
+    
+    def test_invalid_weekdays_rejected(self, auth_headers):
+        """Test a weekday outside 0-6 is rejected on save"""
+        response = requests.post(f"{BASE_URL}/api/admin/promo-codes", json={
+            "code": f"TESTBAD{datetime.now().strftime('%H%M%S%f')}",
+            "discount_type": "percent",
+            "discount_value": 10,
+            "max_usage": 1,
+            "valid_from": "2020-01-01",
+            "valid_until": "2099-12-31",
+            "weekdays": [7]
+        }, headers=auth_headers)
+        assert response.status_code == 400
+
+
+
+class TestBulkPromoCodes:
+    """Test bulk promo code generation - /api/admin/promo-codes/bulk"""
+    
+    @pytest.fixture
+    def auth_headers(self):
+        """Get headers with admin auth token"""
+        response = requests.post(f"{BASE_URL}/api/auth/login", json={
+            "email": ADMIN_EMAIL,
+            "password": ADMIN_PASSWORD
+        })
+        if response.status_code == 200:
+            return {"Authorization": f"Bearer {response.json()['token']}"}
+        pytest.skip("Authentication failed")
+    
+    def bulk_request(self, pattern, count):
+        return {
+            "pattern": pattern,
+            "count": count,
+            "discount_type": "percent",
+            "discount_value": 10,
+            "max_usage": 1,
+            "valid_from": "2020-01-01",
+            "valid_until": "2099-12-31"
+        }
+    
+    def test_bulk_codes_csv(self, auth_headers):
+        """Test exactly `count` unique codes come back as a CSV with the expected header"""
+        response = requests.post(f"{BASE_URL}/api/admin/promo-codes/bulk", json=self.bulk_request("TEST-****", 50), headers=auth_headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        
+        rows = list(csv.reader(io.StringIO(response.text)))
+        assert rows[0] == ["code", "discount_type", "discount_value", "max_usage", "valid_from", "valid_until", "batch_id"]
+        codes = [row[0] for row in rows[1:]]
+        batch_ids = {row[6] for row in rows[1:]}
+        try:
+            assert len(codes) == 50
+            assert len(set(codes)) == 50, "Duplicate codes in one batch"
+            assert all(code.startswith("TEST-") and len(code) == 9 for code in codes)
+            assert len(batch_ids) == 1
+            print(f"✓ Bulk created {len(codes)} unique codes in batch {batch_ids.pop()}")
+        finally:
+            promos = requests.get(f"{BASE_URL}/api/admin/promo-codes", headers=auth_headers).json()
+            for promo in promos:
+                if promo.get("code") in codes:
+                    requests.delete(f"{BASE_URL}/api/admin/promo-codes/{promo['promo_id']}", headers=auth_headers)
+    
+    def test_pattern_too_short(self, auth_headers):
+        """Test a pattern with too few random characters for the count is rejected"""
+        response = requests.post(f"{BASE_URL}/api/admin/promo-codes/bulk", json=self.bulk_request("TEST-#", 1), headers=auth_headers)
+        assert response.status_code == 400
+    
+    def test_count_bounds(self, auth_headers):
+        """Test count must be between 1 and the bulk limit"""
+        for count in (0, 100001):
+            response = requests.post(f"{BASE_URL}/api/admin/promo-codes/bulk", json=self.bulk_request("TEST-********", count), headers=auth_headers)
+            assert response.status_code == 400, f"count={count} was accepted"
+
+
 # Run tests if executed directly
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "--tb=short"])